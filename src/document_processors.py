@@ -16,10 +16,14 @@ Author: AI Assistant
 Date: 2025-08-01
 """
 
+import functools
 import os
 import re
+import shutil
+import threading
 import zipfile
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Tuple, Dict, Optional
 
@@ -29,12 +33,134 @@ except ImportError:
     print("警告: 未找到 PyMuPDF 库，请运行: pip install PyMuPDF")
     fitz = None
 
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
 from .logger import get_logger
 from .config import Config
 from .utils.filename_normalizer import FilenameNormalizer
 from .utils.directory_manager import DirectoryManager
 
 
+# 预编译的正则表达式（避免在每次调用/每个匹配中重复查找编译缓存）
+_DIGIT_RE = re.compile(r'(\d+)')
+_IMAGE_LINK_RE = re.compile(r'!\[([^\]]*)\]\(([^\)]+)\)')
+_MEDIA_IMAGE_NUM_RE = re.compile(r'image(\d+)')
+
+# PDF图片引用模式（顺序匹配，按优先级排列，优化匹配规则，增加专门的"图+数字"模式）
+_REFERENCE_PATTERNS = [
+    # 最高优先级：表格引用模式
+    r'表\s*(\d+)\s*[-–—]\s*(\d+)',  # 表格引用模式
+    r'表\s*(\d+)\s*[._]\s*(\d+)',
+    r'表\s*(\d+)(?!\s*[-–—._]\d)',
+    # 图片引用模式
+    r'图\s*(\d+)\s*[-–—]\s*(\d+)',  # 专门匹配"图 2-1"格式
+    r'图\s*(\d+)\s*[._]\s*(\d+)',   # 匹配"图 2.1"或"图 2_1"格式
+    r'图\s*(\d+)(?!\s*[-–—._]\d)',  # 匹配单独的"图 2"格式
+    r'Fig\s*(\d+)[-_\s]*(\d*)',  # Fig 1-1, Fig1
+    r'Figure\s*(\d+)[-_\s]*(\d*)',  # Figure 1-1
+    r'Table\s*(\d+)[-_\s]*(\d*)',  # Table 1-1, Table1
+]
+_REFERENCE_RES = [re.compile(pattern, re.IGNORECASE) for pattern in _REFERENCE_PATTERNS]
+
+# 所有引用模式的并集，用于单次扫描判断一行是否可能包含引用
+_ANY_REFERENCE_RE = re.compile(
+    '|'.join(f'(?:{pattern})' for pattern in _REFERENCE_PATTERNS), re.IGNORECASE
+)
+
+# Word文档中支持提取的图片格式
+_DOCX_IMAGE_EXTS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp'})
+
+# PDF中可直接保存原始数据（无需重新编码）的图片格式
+_PDF_PASSTHROUGH_EXTS = frozenset({'png', 'jpeg', 'jpg'})
+
+# PyMuPDF 不是线程安全的，所有 fitz 文档操作都在此锁内进行
+_FITZ_LOCK = threading.Lock()
+
+# 流式复制图片数据时的块大小
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+# 写入图片文件时使用的底层打开标志（Windows 下需要二进制模式）
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+# 文件名清理使用的正则表达式
+_UNSAFE_CHARS_RE = re.compile(r'[<>:"/\\|?*]')
+_SPACE_UNDERSCORE_RE = re.compile(r'[\s_]+')
+
+
+@functools.lru_cache(maxsize=256)
+def _sanitize_stem(filename: str) -> str:
+    """
+    清理文件名主干，移除不安全字符（纯函数，结果按文件名缓存）
+    
+    Args:
+        filename: 原始文件名
+        
+    Returns:
+        str: 清理后的安全文件名
+    """
+    name_without_ext = Path(filename).stem
+    safe_name = _UNSAFE_CHARS_RE.sub('_', name_without_ext)
+    return _SPACE_UNDERSCORE_RE.sub('_', safe_name).strip('_')
+
+
+def _render_detail_markdown(doc_name: str, original_filename: str, width: int, height: int,
+                            format_info: str, mode: str, file_size: int,
+                            alt_text: str, image_path: str) -> str:
+    """
+    渲染图片文件转换的Markdown内容（包含元数据）
+    
+    模板以 f-string 形式在模块导入时编译，调用时不再解析格式串。
+    
+    Returns:
+        str: 生成的Markdown内容
+    """
+    return f"""# {doc_name}
+
+## 图片信息
+
+- **文件名**: {original_filename}
+- **尺寸**: {width} x {height} 像素
+- **格式**: {format_info}
+- **颜色模式**: {mode}
+- **文件大小**: {file_size} 字节
+
+## 图片预览
+
+![{alt_text}]({image_path})
+
+---
+
+*此文档由 MarkItDown 自动生成*
+"""
+
+
+def _render_simple_markdown(doc_name: str, original_filename: str,
+                            alt_text: str, image_path: str) -> str:
+    """
+    渲染图片文件转换的Markdown内容（简化版本）
+    
+    Returns:
+        str: 生成的Markdown内容
+    """
+    return f"""# {doc_name}
+
+## 图片文件
+
+- **文件名**: {original_filename}
+
+## 图片预览
+
+![{alt_text}]({image_path})
+
+---
+
+*此文档由 MarkItDown 自动生成*
+"""
+
+
 class BaseDocumentProcessor(ABC):
     """
     文档处理器基类
@@ -55,7 +181,11 @@ class BaseDocumentProcessor(ABC):
         self.logger = get_logger()
         self.directory_manager = directory_manager or DirectoryManager()
         
-    def _sanitize_filename(self, filename: str) -> str:
+        # 最近一次 extract_images 是否出错（出错时返回的映射可能不完整）
+        self.extraction_failed = False
+        
+    @staticmethod
+    def _sanitize_filename(filename: str) -> str:
         """
         清理文件名，移除不安全字符
         
@@ -70,10 +200,7 @@ class BaseDocumentProcessor(ABC):
             return Path(FilenameNormalizer.normalize_filename(filename)).stem
         
         # 原有逻辑作为备用
-        name_without_ext = Path(filename).stem
-        safe_name = re.sub(r'[<>:"/\\|?*]', '_', name_without_ext)
-        safe_name = re.sub(r'[\s_]+', '_', safe_name).strip('_')
-        return safe_name
+        return _sanitize_stem(filename)
     
     def _normalize_document_name(self, filename: str) -> str:
 
@@ -127,13 +254,44 @@ class BaseDocumentProcessor(ABC):
         Returns:
             str: 标准化的相对路径
         """
-        normalized_doc_name = self._normalize_document_name(doc_name)
-        path = f"images/{normalized_doc_name}/{image_filename}"
+        path = self._get_image_path_prefix(doc_name) + image_filename
         
         if base_dir:
             return FilenameNormalizer.ensure_relative_path(path, base_dir)
         return path
     
+    def _get_image_path_prefix(self, doc_name: str) -> str:
+        """
+        生成文档图片相对路径的公共前缀
+        
+        同一文档的所有图片共享该前缀，批量生成链接时只需计算一次。
+        
+        Args:
+            doc_name: 文档名称
+            
+        Returns:
+            str: 以分隔符结尾的相对路径前缀
+        """
+        normalized_doc_name = self._normalize_document_name(doc_name)
+        return f"images/{normalized_doc_name}/"
+    
+    def _get_document_image_dir(self, doc_name: str) -> Path:
+        """
+        获取文档专属的图片目录路径（不创建目录）
+        
+        Args:
+            doc_name: 文档名称
+            
+        Returns:
+            Path: 图片目录路径
+        """
+        # 获取文档类型
+        doc_type = self.__class__.__name__.replace('DocumentProcessor', '').lower()
+        
+        return DirectoryManager.get_image_directory_path(
+            doc_name, doc_type, str(self.images_dir)
+        )
+    
     def _create_document_image_dir(self, doc_name: str) -> Path:
         """
         创建文档专属的图片目录
@@ -185,6 +343,25 @@ class BaseDocumentProcessor(ABC):
         # 返回相对路径
         return f"{dir_path}/{image_filename}"
     
+    @staticmethod
+    def _write_image_file(output_path: Path, image_data: bytes) -> None:
+        """
+        将图片数据写入文件
+        
+        Args:
+            output_path: 输出文件路径
+            image_data: 图片二进制数据
+        """
+        # 直接使用文件描述符写入，绕过缓冲IO层的额外内存拷贝
+        fd = os.open(str(output_path), _WRITE_FLAGS, 0o644)
+        try:
+            view = memoryview(image_data)
+            while view:
+                written = os.write(fd, view)
+                view = view[written:]
+        finally:
+            os.close(fd)
+    
     def _extract_image_number(self, key: str) -> int:
         """
         从图片键值中提取数字编号
@@ -195,7 +372,7 @@ class BaseDocumentProcessor(ABC):
         Returns:
             int: 提取的数字编号
         """
-        match = re.search(r'(\d+)', key)
+        match = _DIGIT_RE.search(key)
         return int(match.group(1)) if match else 0
     
     @abstractmethod
@@ -203,6 +380,8 @@ class BaseDocumentProcessor(ABC):
         """
         从文档中提取图片
         
+        实现应在开始时重置 extraction_failed，任何图片提取失败时将其置为 True。
+        
         Args:
             file_path: 文档文件路径
             output_dir: 输出目录
@@ -245,52 +424,49 @@ class WordDocumentProcessor(BaseDocumentProcessor):
         
         Args:
             file_path: Word文档路径
-            output_dir: 输出目录（实际会使用DirectoryManager生成的路径）
+            output_dir: 输出目录
+            doc_name: 文档名称
             
         Returns:
             Dict[str, str]: 图片索引到文件路径的映射
         """
         extracted_images = {}
+        self.extraction_failed = False
         
         try:
-            # 如果没有提供doc_name，则从文件路径中获取
-            if not doc_name:
-                doc_name = Path(file_path).stem
-            
-            # 使用DirectoryManager创建正确的图片目录
-            actual_output_dir = self._create_document_image_dir(doc_name)
-            
             self.logger.info(f"开始从Word文档提取图片: {file_path}")
-            self.logger.info(f"输出目录: {actual_output_dir}")
+            self.logger.info(f"输出目录: {output_dir}")
             
             with zipfile.ZipFile(file_path, 'r') as docx_zip:
-                # 获取所有媒体文件
-                media_files = [f for f in docx_zip.namelist() if f.startswith('word/media/')]
+                # 获取所有媒体文件（单次遍历中央目录，保留ZipInfo以便直接打开）
+                media_infos = [zi for zi in docx_zip.infolist() if zi.filename.startswith('word/media/')]
                 
-                self.logger.info(f"在Word文档中发现 {len(media_files)} 个媒体文件")
-                self.logger.debug(f"媒体文件列表: {media_files}")
+                self.logger.info(f"在Word文档中发现 {len(media_infos)} 个媒体文件")
+                self.logger.debug(f"媒体文件列表: {[zi.filename for zi in media_infos]}")
                 
-                for i, media_file in enumerate(media_files, 1):
+                for i, media_info in enumerate(media_infos, 1):
+                    media_file = media_info.filename
+                    
                     # 提取文件扩展名
-                    file_ext = Path(media_file).suffix.lower()
+                    file_ext = os.path.splitext(media_file)[1].lower()
                     
                     self.logger.debug(f"处理媒体文件 {i}: {media_file}, 扩展名: {file_ext}")
                     
                     # 检查是否为支持的图片格式
-                    if file_ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp']:
+                    if file_ext in _DOCX_IMAGE_EXTS:
                         # 生成标准化的文件名
                         new_filename = self._generate_image_filename(i, file_ext)
-                        output_path = actual_output_dir / new_filename
+                        output_path = output_dir / new_filename
                         
                         self.logger.debug(f"准备保存图片到: {output_path}")
                         
                         # 确保输出目录存在
                         output_path.parent.mkdir(parents=True, exist_ok=True)
                         
-                        # 提取并保存图片
-                        with docx_zip.open(media_file) as source:
+                        # 分块流式提取并保存图片，避免整张图片读入内存
+                        with docx_zip.open(media_info) as source:
                             with open(output_path, 'wb') as target:
-                                target.write(source.read())
+                                shutil.copyfileobj(source, target, _COPY_CHUNK_SIZE)
                         
                         # 验证文件是否成功保存
                         if output_path.exists():
@@ -300,6 +476,7 @@ class WordDocumentProcessor(BaseDocumentProcessor):
                             extracted_images[key] = str(output_path)
                         else:
                             self.logger.error(f"图片保存失败: {output_path}")
+                            self.extraction_failed = True
                         
                         self.logger.debug(f"提取Word图片: {media_file} -> {new_filename}")
                     else:
@@ -307,6 +484,7 @@ class WordDocumentProcessor(BaseDocumentProcessor):
                         
         except Exception as e:
             self.logger.error(f"提取Word文档图片失败: {e}")
+            self.extraction_failed = True
             
         return extracted_images
     
@@ -348,57 +526,73 @@ class WordDocumentProcessor(BaseDocumentProcessor):
         if not extracted_images:
             return content
         
-        # 查找所有图片链接模式
-        import re
+        # 同一文档的图片共享路径前缀，只计算一次
+        path_prefix = self._get_image_path_prefix(doc_name)
         
-        # 匹配 ![...](media/image*.png) 或类似格式
-        image_pattern = r'!\[([^\]]*)\]\(([^\)]+)\)'
+        # base64图片按顺序对应的提取图片，只排序一次
+        sorted_images = sorted(extracted_images.items(), key=lambda x: self._extract_image_number(x[0]))
         
-        # 用于跟踪base64图片的计数器
-        base64_counter = 1
+        def find_media_image(image_num: int) -> Optional[str]:
+            # 提取的图片键为 image_001 形式，优先 O(1) 查找
+            extracted_path = extracted_images.get(f"image_{image_num:03d}")
+            if extracted_path is not None:
+                return extracted_path
+            # 回退到按文件路径匹配
+            for extracted_path in extracted_images.values():
+                if f"image_{image_num}" in extracted_path:
+                    return extracted_path
+            return None
         
-        def replace_image_link(match):
-            nonlocal base64_counter
+        # 替换所有图片链接
+        # 匹配 ![...](media/image*.png) 或类似格式
+        # 逐个匹配收集片段后一次性拼接，未匹配的链接保持原样
+        parts = []
+        last_end = 0
+        base64_counter = 1  # 用于跟踪base64图片的计数器
+        for match in _IMAGE_LINK_RE.finditer(content):
             alt_text = match.group(1)
             original_path = match.group(2)
+            replacement = None
             
             # 处理base64编码的图片
             if original_path.startswith('data:image'):
                 # 查找对应的提取图片（按顺序匹配）
-                sorted_images = sorted(extracted_images.items(), key=lambda x: self._extract_image_number(x[0]))
                 if base64_counter <= len(sorted_images):
                     key, extracted_path = sorted_images[base64_counter - 1]
-                    image_filename = Path(extracted_path).name
-                    normalized_path = self._get_normalized_relative_path(doc_name, image_filename)
+                    image_filename = os.path.basename(extracted_path)
+                    normalized_path = path_prefix + image_filename
                     normalized_alt = alt_text if alt_text else self._generate_image_alt_text(doc_name, base64_counter)
                     
                     self.logger.info(f"替换base64图片 #{base64_counter}: {normalized_path}")
-                    base64_counter += 1
-                    return f"![{normalized_alt}]({normalized_path})"
-                else:
-                    base64_counter += 1
-                    return match.group(0)
-            
-            # 处理media路径格式的图片
-            image_num_match = re.search(r'image(\d+)', original_path)
-            if image_num_match:
-                image_num = int(image_num_match.group(1))
-                
-                # 查找对应的提取图片
-                for key, extracted_path in extracted_images.items():
-                    if f"image_{image_num:03d}" in key or f"image_{image_num}" in extracted_path:
+                    replacement = f"![{normalized_alt}]({normalized_path})"
+                base64_counter += 1
+            else:
+                # 处理media路径格式的图片
+                image_num_match = _MEDIA_IMAGE_NUM_RE.search(original_path)
+                if image_num_match:
+                    image_num = int(image_num_match.group(1))
+                    
+                    # 查找对应的提取图片
+                    extracted_path = find_media_image(image_num)
+                    if extracted_path is not None:
                         # 生成规范化路径和alt文本
-                        image_filename = Path(extracted_path).name
-                        normalized_path = self._get_normalized_relative_path(doc_name, image_filename)
+                        image_filename = os.path.basename(extracted_path)
+                        normalized_path = path_prefix + image_filename
                         normalized_alt = self._generate_image_alt_text(doc_name, image_num)
                         
-                        return f"![{normalized_alt}]({normalized_path})"
+                        replacement = f"![{normalized_alt}]({normalized_path})"
             
             # 如果没有找到匹配，保持原样
-            return match.group(0)
+            if replacement is not None:
+                parts.append(content[last_end:match.start()])
+                parts.append(replacement)
+                last_end = match.end()
         
-        # 替换所有图片链接
-        normalized_content = re.sub(image_pattern, replace_image_link, content)
+        if not parts:
+            return content
+        
+        parts.append(content[last_end:])
+        normalized_content = ''.join(parts)
         
         return normalized_content
 
@@ -428,66 +622,122 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
             Dict[str, str]: 图片索引到文件路径的映射
         """
         extracted_images = {}
+        self.extraction_failed = False
         
         if fitz is None:
             self.logger.warning("PyMuPDF 未安装，无法从 PDF 提取图片")
+            self.extraction_failed = True
             return extracted_images
         
         try:
             self.logger.info(f"开始从PDF文档提取图片: {file_path}")
             self.logger.info(f"输出目录: {output_dir}")
             
-            doc = fitz.open(file_path)
-            image_count = 0
-            
-            # 重置图片页面信息
-            self.pdf_image_pages = {}
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                image_list = page.get_images()
+            # 并发处理多个文档时，不同文档的PDF提取也必须串行执行
+            with _FITZ_LOCK:
+                doc = fitz.open(file_path)
+                image_count = 0
+                output_dir_ready = False
                 
-                for img_index, img in enumerate(image_list):
-                    image_count += 1
-                    
-                    # 获取图片数据
-                    xref = img[0]
-                    pix = fitz.Pixmap(doc, xref)
+                # 重置图片页面信息
+                self.pdf_image_pages = {}
+                
+                # PyMuPDF 文档对象不支持多线程访问，因此页面遍历和图片数据读取保持串行，
+                # 仅将图片文件写入交给线程池并行执行
+                pending_writes = []
+                saved_xrefs = {}  # xref -> (输出路径, 写入任务)，None 表示该图片被跳过
+                max_workers = Config.PERFORMANCE_CONFIG['max_workers']
+                try:
+                    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                        for page_num in range(len(doc)):
+                            page = doc.load_page(page_num)
+                            image_list = page.get_images()
+                            
+                            for img_index, img in enumerate(image_list):
+                                image_count += 1
+                                
+                                xref = img[0]
+                                
+                                # 同一图片对象（如每页重复的logo）只读取和写入一次，复用已保存的文件
+                                if xref in saved_xrefs:
+                                    saved = saved_xrefs[xref]
+                                    if saved is not None:
+                                        output_path, future = saved
+                                        pending_writes.append((image_count, page_num, output_path, future))
+                                        self.logger.debug(f"复用重复的PDF图片: 页面{page_num + 1} -> {output_path.name}")
+                                    continue
+                                
+                                # 获取图片数据
+                                image_data, extension = self._get_pdf_image_data(doc, xref)
+                                saved_xrefs[xref] = None
+                                
+                                if image_data is not None:
+                                    # 生成标准化的文件名
+                                    new_filename = self._generate_image_filename(image_count, extension)
+                                    output_path = output_dir / new_filename
+                                    
+                                    self.logger.debug(f"准备保存PDF图片到: {output_path}")
+                                    
+                                    # 确保输出目录存在（只需创建一次）
+                                    if not output_dir_ready:
+                                        output_dir.mkdir(parents=True, exist_ok=True)
+                                        output_dir_ready = True
+                                    
+                                    # 提交写入任务
+                                    future = executor.submit(self._write_image_file, output_path, image_data)
+                                    pending_writes.append((image_count, page_num, output_path, future))
+                                    saved_xrefs[xref] = (output_path, future)
+                                    
+                                    self.logger.debug(f"提取PDF图片: 页面{page_num + 1} -> {new_filename}")
+                
+                finally:
+                    doc.close()
                     
-                    if pix.n - pix.alpha < 4:  # 确保不是 CMYK
-                        # 生成标准化的文件名
-                        new_filename = self._generate_image_filename(image_count, ".png")
-                        output_path = output_dir / new_filename
-                        
-                        self.logger.debug(f"准备保存PDF图片到: {output_path}")
-                        
-                        # 确保输出目录存在
-                        output_path.parent.mkdir(parents=True, exist_ok=True)
+                    # 按提取顺序收集写入结果（中途出错时也保留已完成的图片）
+                    for index, page_num, output_path, future in pending_writes:
+                        try:
+                            future.result()
+                        except OSError as e:
+                            self.logger.error(f"PDF图片保存失败: {output_path} - {e}")
+                            self.extraction_failed = True
+                            continue
                         
-                        # 保存图片
-                        pix.save(str(output_path))
-                        
-                        # 验证文件是否成功保存
-                        if output_path.exists():
-                            self.logger.debug(f"PDF图片保存成功: {output_path}")
-                            # 记录图片和页面信息
-                            key = f"image_{image_count:03d}"
-                            extracted_images[key] = str(output_path)
-                            self.pdf_image_pages[key] = page_num + 1  # 页面从1开始计数
-                        else:
-                            self.logger.error(f"PDF图片保存失败: {output_path}")
-                        
-                        self.logger.debug(f"提取PDF图片: 页面{page_num + 1} -> {new_filename}")
-                    
-                    pix = None  # 释放内存
-            
-            doc.close()
+                        self.logger.debug(f"PDF图片保存成功: {output_path}")
+                        # 记录图片和页面信息
+                        key = f"image_{index:03d}"
+                        extracted_images[key] = str(output_path)
+                        self.pdf_image_pages[key] = page_num + 1  # 页面从1开始计数
             
         except Exception as e:
             self.logger.error(f"提取PDF文档图片失败: {e}")
+            self.extraction_failed = True
             
         return extracted_images
     
+    def _get_pdf_image_data(self, doc, xref: int) -> Tuple[Optional[bytes], str]:
+        """
+        获取PDF中图片的可保存数据
+        
+        优先直接取出PDF中嵌入的原始 PNG/JPEG 数据，避免解码后再重新编码；
+        其他格式回退到 Pixmap 并编码为 PNG。
+        
+        Args:
+            doc: PyMuPDF 文档对象
+            xref: 图片对象的交叉引用编号
+            
+        Returns:
+            Tuple[Optional[bytes], str]: (图片数据, 文件扩展名)，CMYK 图片返回 (None, "")
+        """
+        raw = doc.extract_image(xref)
+        if (raw and raw.get('image') and raw.get('ext') in _PDF_PASSTHROUGH_EXTS
+                and raw.get('colorspace', 0) < 4):  # 确保不是 CMYK
+            return raw['image'], f".{raw['ext']}"
+        
+        pix = fitz.Pixmap(doc, xref)
+        if pix.n - pix.alpha < 4:  # 确保不是 CMYK
+            return pix.tobytes("png"), ".png"
+        return None, ""
+    
     def process_content(self, content: str, doc_name: str, extracted_images: Dict[str, str]) -> Tuple[str, int]:
         """
         处理PDF文档内容，智能插入图片
@@ -503,8 +753,11 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
         if not extracted_images:
             return content, 0
         
-        # 按图片编号排序
-        sorted_images = sorted(extracted_images.items(), key=lambda x: self._extract_image_number(x[0]))
+        # 按图片编号排序，并一次性过滤掉不存在的图片文件（后续步骤不再逐个检查）
+        sorted_images = [
+            item for item in sorted(extracted_images.items(), key=lambda x: self._extract_image_number(x[0]))
+            if os.path.exists(item[1])
+        ]
         
         # 检查是否为图片型PDF（内容为空或只有少量文本）
         if not content.strip() or len(content.strip()) < 50:
@@ -514,9 +767,7 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
             # 使用智能插入逻辑
             content = self._insert_images_intelligently(content, doc_name, sorted_images)
         
-        processed_count = len([img for img in sorted_images if os.path.exists(img[1])])
-        
-        return content, processed_count
+        return content, len(sorted_images)
 
     def _create_image_based_markdown(self, doc_name: str, sorted_images: List[Tuple[str, str]]) -> str:
         """
@@ -524,7 +775,7 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
         
         Args:
             doc_name: 文档名称
-            sorted_images: 排序后的图片列表
+            sorted_images: 排序后的图片列表（仅包含已存在的图片文件）
             
         Returns:
             str: 生成的Markdown内容
@@ -532,14 +783,14 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
         markdown_content = f"# {doc_name}\n\n"
         markdown_content += "**注意**: 这是一个图片型PDF文档，无法提取文本内容。以下是提取的图片：\n\n"
         
+        # 同一文档的图片目录相同，只计算一次
+        image_dir_prefix = self._get_relative_image_path(doc_name, "")
+        
         # 按页面分组图片
         current_page = 1
         images_added_to_page = False
         
         for image_key, image_path in sorted_images:
-            if not os.path.exists(image_path):
-                continue
-                
             # 获取图片对应的页面
             image_page = self.pdf_image_pages.get(image_key, current_page)
             
@@ -553,7 +804,7 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
                 images_added_to_page = True
             
             # 生成相对路径
-            relative_path = self._get_relative_image_path(doc_name, os.path.basename(image_path))
+            relative_path = image_dir_prefix + os.path.basename(image_path)
             
             # 生成alt文本
             image_number = self._extract_image_number(image_key)
@@ -573,7 +824,7 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
         Args:
             content: Markdown内容
             doc_name: 文档名称
-            sorted_images: 排序后的图片列表
+            sorted_images: 排序后的图片列表（仅包含已存在的图片文件）
             
         Returns:
             str: 插入图片后的内容
@@ -595,7 +846,7 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
         Args:
             content: Markdown内容
             doc_name: 文档名称
-            sorted_images: 排序后的图片列表
+            sorted_images: 排序后的图片列表（仅包含已存在的图片文件）
             
         Returns:
             str: 插入图片后的内容
@@ -603,91 +854,59 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
         lines = content.split('\n')
         inserted_count = 0
         
-        # 图片引用模式（优化匹配规则，增加专门的"图+数字"模式）
-        patterns = [
-            # 最高优先级：表格引用模式
-            {'pattern': r'表\s*(\d+)\s*[-–—]\s*(\d+)', 'type': 'sequential'},  # 表格引用模式
-            {'pattern': r'表\s*(\d+)\s*[._]\s*(\d+)', 'type': 'sequential'},
-            {'pattern': r'表\s*(\d+)(?!\s*[-–—._]\d)', 'type': 'sequential'},
-            # 图片引用模式
-            {'pattern': r'图\s*(\d+)\s*[-–—]\s*(\d+)', 'type': 'sequential'},  # 专门匹配"图 2-1"格式
-            {'pattern': r'图\s*(\d+)\s*[._]\s*(\d+)', 'type': 'sequential'},   # 匹配"图 2.1"或"图 2_1"格式
-            {'pattern': r'图\s*(\d+)(?!\s*[-–—._]\d)', 'type': 'sequential'},  # 匹配单独的"图 2"格式
-            {'pattern': r'Fig\s*(\d+)[-_\s]*(\d*)', 'type': 'sequential'},  # Fig 1-1, Fig1
-            {'pattern': r'Figure\s*(\d+)[-_\s]*(\d*)', 'type': 'sequential'},  # Figure 1-1
-            {'pattern': r'Table\s*(\d+)[-_\s]*(\d*)', 'type': 'sequential'},  # Table 1-1, Table1
-            {'pattern': r'见图', 'type': 'keyword'},  # 见图
-            {'pattern': r'如图', 'type': 'keyword'},  # 如图
-            {'pattern': r'图示', 'type': 'keyword'},  # 图示
-            {'pattern': r'上图', 'type': 'keyword'},  # 上图
-            {'pattern': r'下图', 'type': 'keyword'},  # 下图
-            {'pattern': r'如图所示', 'type': 'keyword'},  # 如图所示
-            {'pattern': r'参见图', 'type': 'keyword'},  # 参见图
-            {'pattern': r'详见图', 'type': 'keyword'},  # 详见图
-            {'pattern': r'诊疗流程.*?图', 'type': 'keyword'},  # 诊疗流程图
-            {'pattern': r'流程图', 'type': 'keyword'},  # 流程图
-            {'pattern': r'示意图', 'type': 'keyword'},  # 示意图
-            {'pattern': r'示例图', 'type': 'keyword'},  # 示例图
-            {'pattern': r'附图', 'type': 'keyword'},  # 附图
-            {'pattern': r'配图', 'type': 'keyword'},  # 配图
-            {'pattern': r'右图', 'type': 'keyword'},  # 右图
-            {'pattern': r'左图', 'type': 'keyword'},  # 左图
-        ]
-        
         # 先收集所有"图 X-Y"格式的引用位置
         figure_references = []
         for i, line in enumerate(lines):
-            for pattern_info in patterns:
-                if pattern_info['type'] == 'sequential':
-                    pattern = pattern_info['pattern']
-                    matches = re.finditer(pattern, line, re.IGNORECASE)
-                    for match in matches:
-                        if match.groups():
-                            try:
-                                ref_number = int(match.group(1))
-                                second_number = None
-                                if len(match.groups()) > 1 and match.group(2) and match.group(2).strip():
-                                    second_number = int(match.group(2))
-                                
-                                # 计算权重分数
-                                score = 0.5  # 基础分数
-                                if second_number is not None:
-                                    # "图 X-Y"格式，给予更高权重
-                                    if '图' in line and ('-' in line or '–' in line or '—' in line):
-                                        score = 0.85
-                                    else:
-                                        score = 0.75
-                                    
-                                    # 添加特殊关键词加权
-                                    if any(keyword in line for keyword in ['诊疗', '流程', '示意', '获得性']):
-                                        score += 0.1
+            # 单次扫描预筛选：绝大多数行不含任何引用，无需逐个模式扫描
+            if not _ANY_REFERENCE_RE.search(line):
+                continue
+            
+            for pattern in _REFERENCE_RES:
+                for match in pattern.finditer(line):
+                    if match.groups():
+                        try:
+                            ref_number = int(match.group(1))
+                            second_number = None
+                            if len(match.groups()) > 1 and match.group(2) and match.group(2).strip():
+                                second_number = int(match.group(2))
+                            
+                            # 计算权重分数
+                            score = 0.5  # 基础分数
+                            if second_number is not None:
+                                # "图 X-Y"格式，给予更高权重
+                                if '图' in line and ('-' in line or '–' in line or '—' in line):
+                                    score = 0.85
                                 else:
-                                    # 单独的"图 X"格式
-                                    score = 0.6
-                                    if any(keyword in line for keyword in ['诊疗', '流程', '示意']):
-                                        score += 0.15
+                                    score = 0.75
                                 
-                                figure_references.append({
-                                    'line_index': i,
-                                    'ref_number': ref_number,
-                                    'second_number': second_number,
-                                    'score': score,
-                                    'line_content': line
-                                })
-                            except (ValueError, IndexError):
-                                pass
+                                # 添加特殊关键词加权
+                                if any(keyword in line for keyword in ['诊疗', '流程', '示意', '获得性']):
+                                    score += 0.1
+                            else:
+                                # 单独的"图 X"格式
+                                score = 0.6
+                                if any(keyword in line for keyword in ['诊疗', '流程', '示意']):
+                                    score += 0.15
+                            
+                            figure_references.append({
+                                'line_index': i,
+                                'ref_number': ref_number,
+                                'second_number': second_number,
+                                'score': score,
+                                'line_content': line
+                            })
+                        except (ValueError, IndexError):
+                            pass
         
         # 按行号排序，确保按文档顺序处理
         figure_references.sort(key=lambda x: x['line_index'])
         
         # 按顺序为每个图片引用插入图片
+        path_prefix = self._get_image_path_prefix(doc_name)
         used_references = set()
         for idx, (key, image_path) in enumerate(sorted_images):
-            if not os.path.exists(image_path):
-                continue
-            
-            image_name = Path(image_path).name
-            relative_path = self._get_normalized_relative_path(doc_name, image_name)
+            image_name = os.path.basename(image_path)
+            relative_path = path_prefix + image_name
             
             # 生成图片引用
             image_number = self._extract_image_number(key)
@@ -824,24 +1043,24 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
         Args:
             content: Markdown内容
             doc_name: 文档名称
-            sorted_images: 排序后的图片列表
+            sorted_images: 排序后的图片列表（仅包含已存在的图片文件）
             
         Returns:
             str: 插入图片后的内容
         """
         lines = content.split('\n')
         total_lines = len(lines)
+        upper = total_lines - 1
         
         # 估算文档总页数（基于内容长度）
         estimated_total_pages = max(10, total_lines // 50)  # 假设每页约50行
         
+        path_prefix = self._get_image_path_prefix(doc_name)
+        
         for key, image_path in sorted_images:
-            if not os.path.exists(image_path):
-                continue
-            
             page_num = self.pdf_image_pages.get(key, 1)
-            image_name = Path(image_path).name
-            relative_path = self._get_normalized_relative_path(doc_name, image_name)
+            image_name = os.path.basename(image_path)
+            relative_path = path_prefix + image_name
             
             # 生成图片引用
             image_number = self._extract_image_number(key)
@@ -849,8 +1068,12 @@ class PDFDocumentProcessor(BaseDocumentProcessor):
             image_ref = f"![{alt_text}]({relative_path})"
             
             # 根据页面比例计算插入位置
-            estimated_line = int((page_num / estimated_total_pages) * total_lines)
-            estimated_line = max(0, min(estimated_line, total_lines - 1))
+            # 先乘后除，保持整数运算
+            estimated_line = (page_num * total_lines) // estimated_total_pages
+            if estimated_line < 0:
+                estimated_line = 0
+            elif estimated_line > upper:
+                estimated_line = upper
             
             # 寻找更合适的插入位置（避免插入到段落中间）
             best_position = self._find_best_insertion_point(lines, estimated_line)
@@ -915,9 +1138,9 @@ class ImageDocumentProcessor(BaseDocumentProcessor):
         Returns:
             Dict[str, str]: 图片映射字典 {原始名称: 新文件名}
         """
+        self.extraction_failed = False
+        
         try:
-            import shutil
-            
             self.logger.info(f"开始复制图片文件: {file_path}")
             self.logger.info(f"目标输出目录: {output_dir}")
             
@@ -929,6 +1152,7 @@ class ImageDocumentProcessor(BaseDocumentProcessor):
             source_path = Path(file_path)
             if not source_path.exists():
                 self.logger.error(f"源图片文件不存在: {file_path}")
+                self.extraction_failed = True
                 return {}
             
             # 生成目标文件名
@@ -946,6 +1170,7 @@ class ImageDocumentProcessor(BaseDocumentProcessor):
                 self.logger.info(f"复制后文件大小: {target_path.stat().st_size} 字节")
             else:
                 self.logger.error(f"图片文件复制失败，目标文件不存在: {target_path}")
+                self.extraction_failed = True
                 return {}
             
             return {source_path.name: target_filename}
@@ -954,6 +1179,7 @@ class ImageDocumentProcessor(BaseDocumentProcessor):
             self.logger.error(f"复制图片文件失败: {str(e)}")
             import traceback
             self.logger.error(f"错误详情: {traceback.format_exc()}")
+            self.extraction_failed = True
             return {}
     
     def process_content(self, content: str, doc_name: str, extracted_images: Dict[str, str]) -> Tuple[str, int]:
@@ -974,92 +1200,54 @@ class ImageDocumentProcessor(BaseDocumentProcessor):
         # 获取原始图片文件信息
         original_filename = list(extracted_images.keys())[0]
         image_filename = list(extracted_images.values())[0]
-        image_path = self._get_normalized_relative_path(doc_name, Path(image_filename).name)
+        image_path = self._get_normalized_relative_path(doc_name, os.path.basename(image_filename))
+        alt_text = self._generate_image_alt_text(doc_name, 1)
+        processed_content = None
         
         # 尝试获取图片元数据
-        try:
-            from PIL import Image
-            import os
-            
+        if Image is None:
+            self.logger.warning("PIL 库未安装，使用简化的图片处理")
+        else:
             # 构建原始图片路径（假设在input目录）
             original_path = f"input/{original_filename}"
-            if os.path.exists(original_path):
-                with Image.open(original_path) as img:
-                    width, height = img.size
-                    format_info = img.format or "Unknown"
-                    mode = img.mode
-                    file_size = os.path.getsize(original_path)
-                
-                # 生成包含元数据的完整Markdown内容
-                processed_content = f"""# {doc_name}
-
-## 图片信息
-
-- **文件名**: {original_filename}
-- **尺寸**: {width} x {height} 像素
-- **格式**: {format_info}
-- **颜色模式**: {mode}
-- **文件大小**: {file_size} 字节
-
-## 图片预览
-
-![{self._generate_image_alt_text(doc_name, 1)}]({image_path})
-
----
-
-*此文档由 MarkItDown 自动生成*
-"""
-            else:
-                # 如果找不到原始文件，使用简化版本
-                processed_content = f"""# {doc_name}
-
-## 图片文件
-
-- **文件名**: {original_filename}
-
-## 图片预览
-
-![{self._generate_image_alt_text(doc_name, 1)}]({image_path})
-
----
-
-*此文档由 MarkItDown 自动生成*
-"""
-                
-        except ImportError:
-            self.logger.warning("PIL 库未安装，使用简化的图片处理")
-            # 生成简化的Markdown内容
-            processed_content = f"""# {doc_name}
-
-## 图片文件
-
-- **文件名**: {original_filename}
-
-## 图片预览
-
-![{self._generate_image_alt_text(doc_name, 1)}]({image_path})
-
----
-
-*此文档由 MarkItDown 自动生成*
-"""
-        except Exception as e:
-            self.logger.warning(f"无法读取图片元数据: {e}")
-            # 生成简化的Markdown内容
-            processed_content = f"""# {doc_name}
-
-## 图片文件
-
-- **文件名**: {original_filename}
-
-## 图片预览
-
-![{self._generate_image_alt_text(doc_name, 1)}]({image_path})
-
----
-
-*此文档由 MarkItDown 自动生成*
-"""
+            file_size = None
+            # 一次 stat 同时完成存在性检查和文件大小读取
+            try:
+                file_size = os.stat(original_path).st_size
+            except OSError:
+                pass
+            
+            if file_size is not None:
+                try:
+                    # 只打开一次图片，头信息读取后即关闭
+                    with Image.open(original_path) as img:
+                        width, height = img.size
+                        format_info = img.format or "Unknown"
+                        mode = img.mode
+                    
+                    # 生成包含元数据的完整Markdown内容
+                    processed_content = _render_detail_markdown(
+                        doc_name=doc_name,
+                        original_filename=original_filename,
+                        width=width,
+                        height=height,
+                        format_info=format_info,
+                        mode=mode,
+                        file_size=file_size,
+                        alt_text=alt_text,
+                        image_path=image_path
+                    )
+                except Exception as e:
+                    self.logger.warning(f"无法读取图片元数据: {e}")
+        
+        if processed_content is None:
+            # 找不到原始文件或无法读取元数据时，使用简化版本
+            processed_content = _render_simple_markdown(
+                doc_name=doc_name,
+                original_filename=original_filename,
+                alt_text=alt_text,
+                image_path=image_path
+            )
         
         self.logger.info(f"图片内容处理完成，插入了 1 张图片")
         return processed_content, 1
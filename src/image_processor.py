@@ -16,15 +16,93 @@ Author: AI Assistant
 Date: 2025-08-01
 """
 
+import asyncio
+import multiprocessing
 import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
-from .document_processors import DocumentProcessorFactory
-from .logger import get_logger
+from .document_processors import BaseDocumentProcessor, DocumentProcessorFactory
+from .logger import configure_worker_logging, get_logger, start_worker_log_listener
+from .path_manager import forget_ensured_dir
 from .utils.directory_manager import DirectoryManager
 
 
+# 统计时计入的图片扩展名
+_STATS_IMAGE_EXTS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp'})
+
+# 后台删除旧图片目录的单线程执行器（首次使用时创建，解释器退出前会等待删除完成）
+_cleanup_executor: Optional[ThreadPoolExecutor] = None
+_cleanup_lock = threading.Lock()
+
+# 本进程中已清扫过遗留待删除目录的父目录
+_swept_parent_dirs: Set[str] = set()
+
+# 临时提取目录超过该时长（秒）未修改，视为中断遗留，可以清理
+_STALE_STAGING_SECONDS = 3600
+
+# 串行化图片目录的替换，同一进程内同名目录的并发替换不会互相干扰
+_swap_lock = threading.Lock()
+
+
+def _get_cleanup_executor() -> ThreadPoolExecutor:
+    """
+    获取后台删除目录的执行器
+    
+    Returns:
+        ThreadPoolExecutor: 单线程执行器
+    """
+    global _cleanup_executor
+    with _cleanup_lock:
+        if _cleanup_executor is None:
+            _cleanup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-cleanup')
+        return _cleanup_executor
+
+
+def _sweep_pending_deletions(parent_dir: Path) -> None:
+    """
+    删除进程中断后遗留的目录（每个父目录每个进程只扫描一次）
+    
+    .<目录名>.deleting-* 总是可以删除；.<目录名>.new-* 可能正被其他线程或进程
+    用于提取，只删除长时间未修改的。
+    
+    Args:
+        parent_dir: 文档图片目录所在的父目录
+    """
+    key = os.path.normpath(parent_dir)
+    with _cleanup_lock:
+        if key in _swept_parent_dirs:
+            return
+        _swept_parent_dirs.add(key)
+    
+    stale_before = time.time() - _STALE_STAGING_SECONDS
+    stale_dirs = []
+    try:
+        with os.scandir(parent_dir) as entries:
+            for entry in entries:
+                if not entry.name.startswith('.') or not entry.is_dir(follow_symlinks=False):
+                    continue
+                if '.deleting-' in entry.name:
+                    stale_dirs.append(entry.path)
+                elif '.new-' in entry.name:
+                    try:
+                        if entry.stat(follow_symlinks=False).st_mtime < stale_before:
+                            stale_dirs.append(entry.path)
+                    except FileNotFoundError:
+                        continue
+    except FileNotFoundError:
+        return
+    
+    executor = _get_cleanup_executor()
+    for stale_dir in stale_dirs:
+        executor.submit(shutil.rmtree, stale_dir, True)
+
+
 class ImageProcessor:
     """
     图片处理器类
@@ -44,10 +122,14 @@ class ImageProcessor:
         self.logger = get_logger()
         self.directory_manager = DirectoryManager()
         
+        # 按扩展名缓存文档处理器，批量处理同类文档时复用
+        # 处理器的文档相关数据均通过参数传入，extract_images 会重置每个文档的状态
+        self._processor_cache: Dict[str, BaseDocumentProcessor] = {}
+        
         # 确保图片目录存在
         Path(self.images_dir).mkdir(parents=True, exist_ok=True)
         
-        self.logger.debug(f"图片处理器初始化完成 - 图片目录: {self.images_dir}")
+        self.logger.debug("图片处理器初始化完成 - 图片目录: %s", self.images_dir)
     
     def process_images(self, content: str, doc_name: str, original_file_path: str = None) -> Tuple[str, int]:
         """
@@ -58,6 +140,71 @@ class ImageProcessor:
             doc_name: 文档名称
             original_file_path: 原始文档路径（用于直接提取图片）
             
+        Returns:
+            Tuple[str, int]: (更新后的内容, 图片数量)
+        """
+        return self._process_images(content, doc_name, original_file_path, self._get_cached_processor)
+    
+    async def process_images_async(self, content: str, doc_name: str, original_file_path: str = None) -> Tuple[str, int]:
+        """
+        异步处理文档中的所有图片
+        
+        阻塞的处理流程放到线程中执行，便于批量处理时重叠多个文档的IO。
+        每次调用使用独立的文档处理器，避免并发文档共享PDF页面信息等状态。
+        
+        Args:
+            content: Markdown 内容
+            doc_name: 文档名称
+            original_file_path: 原始文档路径（用于直接提取图片）
+            
+        Returns:
+            Tuple[str, int]: (更新后的内容, 图片数量)
+        """
+        return await asyncio.to_thread(
+            self._process_images, content, doc_name, original_file_path, self._create_processor
+        )
+    
+    def _get_cached_processor(self, original_file_path: str) -> BaseDocumentProcessor:
+        """
+        获取文档处理器（同一扩展名只创建一次）
+        
+        Args:
+            original_file_path: 原始文档路径
+            
+        Returns:
+            BaseDocumentProcessor: 文档处理器
+        """
+        ext = os.path.splitext(original_file_path)[1].lower()
+        processor = self._processor_cache.get(ext)
+        if processor is None:
+            processor = self._processor_cache[ext] = self._create_processor(original_file_path)
+        return processor
+    
+    def _create_processor(self, original_file_path: str) -> BaseDocumentProcessor:
+        """
+        根据文件类型创建新的文档处理器
+        
+        Args:
+            original_file_path: 原始文档路径
+            
+        Returns:
+            BaseDocumentProcessor: 文档处理器
+        """
+        return DocumentProcessorFactory.create_processor(
+            original_file_path, self.images_dir, self.directory_manager
+        )
+    
+    def _process_images(self, content: str, doc_name: str, original_file_path: Optional[str],
+                        get_processor: Callable[[str], BaseDocumentProcessor]) -> Tuple[str, int]:
+        """
+        同步和异步图片处理共用的处理流程
+        
+        Args:
+            content: Markdown 内容
+            doc_name: 文档名称
+            original_file_path: 原始文档路径
+            get_processor: 根据文档路径获取文档处理器的函数
+            
         Returns:
             Tuple[str, int]: (更新后的内容, 图片数量)
         """
@@ -69,19 +216,11 @@ class ImageProcessor:
             return content, 0
         
         try:
-            # 根据文件类型创建相应的文档处理器
-            processor = DocumentProcessorFactory.create_processor(
-                original_file_path, self.images_dir, self.directory_manager
-            )
-            
-            # 创建文档专属的图片目录
-            doc_image_dir = processor._create_document_image_dir(doc_name)
+            # 根据文件类型获取相应的文档处理器
+            processor = get_processor(original_file_path)
             
-            # 清理旧的图片目录（如果存在）
-            self._cleanup_old_images(doc_image_dir)
-            
-            # 从原始文档中提取图片
-            extracted_images = processor.extract_images(original_file_path, doc_image_dir, doc_name)
+            # 从原始文档中提取图片，并替换旧的图片目录
+            extracted_images = self._extract_into_image_dir(processor, original_file_path, doc_name)
             
             # 处理文档内容，插入图片
             updated_content, processed_count = processor.process_content(content, doc_name, extracted_images)
@@ -97,17 +236,77 @@ class ImageProcessor:
             self.logger.error(f"图片处理失败: {e}")
             return content, 0
     
-    def _cleanup_old_images(self, doc_image_dir: Path) -> None:
+    def _extract_into_image_dir(self, processor: BaseDocumentProcessor,
+                                original_file_path: str, doc_name: str) -> Dict[str, str]:
+        """
+        将图片提取到同级临时目录，完成后整体替换文档图片目录
+        
+        提取过程中旧图片保持不变；提取出错时丢弃不完整的新结果、保留旧目录并抛出异常。
+        提取成功但文档中没有图片时，同样删除旧目录。
+        
+        Args:
+            processor: 文档处理器
+            original_file_path: 原始文档路径
+            doc_name: 文档名称
+            
+        Returns:
+            Dict[str, str]: 图片索引到最终文件路径的映射
+            
+        Raises:
+            RuntimeError: 图片提取出错
+        """
+        doc_image_dir = processor._get_document_image_dir(doc_name)
+        # 每次提取使用唯一的临时目录，映射到同一图片目录的并发文档（如同名的 .docx 和 .pdf）互不干扰
+        staging_dir = doc_image_dir.with_name(f".{doc_image_dir.name}.new-{uuid.uuid4().hex}")
+        
+        # 清理之前中断遗留的临时目录和待删除目录
+        _sweep_pending_deletions(doc_image_dir.parent)
+        
+        extracted_images = processor.extract_images(original_file_path, staging_dir, doc_name)
+        
+        if processor.extraction_failed:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            forget_ensured_dir(staging_dir)
+            DirectoryManager.forget_created_dir(staging_dir)
+            raise RuntimeError(f"图片提取失败，保留原有图片目录: {doc_image_dir}")
+        
+        with _swap_lock:
+            if doc_image_dir.exists():
+                self._discard_dir(doc_image_dir)
+            
+            # 文档中没有图片时不会创建临时目录
+            if not staging_dir.exists():
+                return extracted_images
+            
+            os.rename(staging_dir, doc_image_dir)
+        forget_ensured_dir(staging_dir)
+        DirectoryManager.forget_created_dir(staging_dir)
+        
+        # 提取结果指向临时目录，改为最终目录下的路径
+        staging_prefix = str(staging_dir)
+        return {
+            key: str(doc_image_dir / os.path.basename(path)) if os.path.dirname(path) == staging_prefix else path
+            for key, path in extracted_images.items()
+        }
+    
+    def _discard_dir(self, dir_path: Path) -> None:
         """
-        清理旧的图片目录
+        删除旧的图片目录：先重命名移开，逐个删除文件的耗时操作交给后台线程
         
         Args:
-            doc_image_dir: 文档图片目录
+            dir_path: 要删除的目录
         """
-        if doc_image_dir.exists():
-            import shutil
-            shutil.rmtree(doc_image_dir)
-            self.logger.debug(f"清理旧图片目录: {doc_image_dir}")
+        pending_dir = dir_path.with_name(f".{dir_path.name}.deleting-{uuid.uuid4().hex[:8]}")
+        try:
+            os.rename(dir_path, pending_dir)
+        except OSError as e:
+            self.logger.debug("重命名旧图片目录失败，改为直接删除: %s - %s", dir_path, e)
+            shutil.rmtree(dir_path)
+        else:
+            _get_cleanup_executor().submit(shutil.rmtree, pending_dir, True)
+        forget_ensured_dir(dir_path)
+        DirectoryManager.forget_created_dir(dir_path)
+        self.logger.debug("清理旧图片目录: %s", dir_path)
     
     def get_image_stats(self, doc_name: str, doc_type: str = 'default') -> dict:
         """
@@ -127,15 +326,16 @@ class ImageProcessor:
             )
             
             if doc_image_dir.exists():
-                image_files = list(doc_image_dir.glob("*.png")) + \
-                             list(doc_image_dir.glob("*.jpg")) + \
-                             list(doc_image_dir.glob("*.jpeg")) + \
-                             list(doc_image_dir.glob("*.gif")) + \
-                             list(doc_image_dir.glob("*.bmp")) + \
-                             list(doc_image_dir.glob("*.webp"))
+                # 单次遍历目录统计图片，DirEntry 自带类型信息，无需逐个 stat
+                image_count = 0
+                with os.scandir(doc_image_dir) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False) and \
+                                os.path.splitext(entry.name)[1].lower() in _STATS_IMAGE_EXTS:
+                            image_count += 1
                 
                 return {
-                    'total_images': len(image_files),
+                    'total_images': image_count,
                     'doc_image_dir_exists': True,
                     'image_dir_path': str(doc_image_dir)
                 }
@@ -172,6 +372,109 @@ class ImageProcessor:
             return 0
 
 
+async def batch_process(items: Iterable[Tuple[str, str, Optional[str]]],
+                        images_dir: str = "images",
+                        max_concurrency: int = 16) -> List[Tuple[str, int]]:
+    """
+    并发处理多个文档的图片
+    
+    各文档的处理在线程中重叠执行；PDF提取由文档处理器内部的锁串行化，
+    PyMuPDF 不会被多个线程同时调用。
+    
+    Args:
+        items: (Markdown 内容, 文档名称, 原始文档路径) 元组序列
+        images_dir: 图片存储根目录
+        max_concurrency: 同时处理的最大文档数
+        
+    Returns:
+        List[Tuple[str, int]]: 按输入顺序排列的 (更新后的内容, 图片数量)
+    """
+    image_processor = ImageProcessor(images_dir)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def process_one(content: str, doc_name: str, original_file_path: Optional[str]) -> Tuple[str, int]:
+        async with semaphore:
+            return await image_processor.process_images_async(content, doc_name, original_file_path)
+    
+    return await asyncio.gather(*(process_one(*item) for item in items))
+
+
+# 工作进程内复用的图片处理器，由 _init_worker 在每个进程中创建一次
+_worker_image_processor: Optional[ImageProcessor] = None
+
+
+def _init_worker(images_dir: str, log_queue, log_level: int) -> None:
+    """
+    初始化批量处理的工作进程
+    
+    Args:
+        images_dir: 图片存储根目录
+        log_queue: 将日志发送给主进程的队列
+        log_level: 主进程的日志级别
+    """
+    global _worker_image_processor, _cleanup_executor, _cleanup_lock, _swap_lock
+    
+    # 日志统一发回主进程输出，并沿用主进程的日志级别
+    configure_worker_logging(log_queue, log_level)
+    
+    # 以 fork 方式启动时，继承的后台删除线程不存在于子进程中，首次使用时重新创建；
+    # 锁也重新创建，避免继承到 fork 时被其他线程持有的锁
+    _cleanup_executor = None
+    _cleanup_lock = threading.Lock()
+    _swap_lock = threading.Lock()
+    
+    _worker_image_processor = ImageProcessor(images_dir)
+
+
+def _process_images_worker(item: Tuple[str, str, Optional[str]]) -> Tuple[str, int]:
+    """
+    在工作进程中处理单个文档的图片
+    
+    Args:
+        item: (Markdown 内容, 文档名称, 原始文档路径)
+        
+    Returns:
+        Tuple[str, int]: (更新后的内容, 图片数量)
+    """
+    content, doc_name, original_file_path = item
+    return _worker_image_processor.process_images(content, doc_name, original_file_path)
+
+
+def batch_process_images(items: Iterable[Tuple[str, str, Optional[str]]],
+                         images_dir: str = "images",
+                         max_workers: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    使用多进程并行处理多个文档的图片
+    
+    PDF渲染、DOCX解压等提取工作以CPU为主，多进程可绕过GIL。
+    
+    Args:
+        items: (Markdown 内容, 文档名称, 原始文档路径) 元组序列
+        images_dir: 图片存储根目录
+        max_workers: 工作进程数，默认为CPU核心数
+        
+    Returns:
+        List[Tuple[str, int]]: 按输入顺序排列的 (更新后的内容, 图片数量)
+    """
+    items = list(items)
+    if not items:
+        return []
+    
+    max_workers = max_workers or os.cpu_count() or 1
+    chunksize = max(1, len(items) // (4 * max_workers))
+    
+    # 工作进程的日志经队列交给主进程的处理器输出
+    log_queue = multiprocessing.Queue(-1)
+    log_listener = start_worker_log_listener(log_queue)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_worker,
+                                 initargs=(images_dir, log_queue, get_logger().getEffectiveLevel())) as executor:
+            return list(executor.map(_process_images_worker, items, chunksize=chunksize))
+    finally:
+        log_listener.stop()
+
+
 if __name__ == '__main__':
     # 测试图片处理器
     processor = ImageProcessor()
@@ -12,14 +12,36 @@ Version: 1.0.0
 
 import os
 import sys
+import atexit
+import functools
+import platform
+import queue
 import logging
 import logging.handlers
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 from .config import Config
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+@functools.lru_cache(maxsize=None)
+def _get_static_system_info() -> tuple:
+    """获取进程生命周期内不变的系统信息（只计算一次）
+    
+    Returns:
+        tuple: (操作系统, 系统版本, Python版本, CPU核心数)
+    """
+    cpu_count = psutil.cpu_count() if psutil is not None else os.cpu_count()
+    return platform.system(), platform.release(), platform.python_version(), cpu_count
+
 
 class ColoredFormatter(logging.Formatter):
     """带颜色的日志格式化器
@@ -37,6 +59,24 @@ class ColoredFormatter(logging.Formatter):
         'RESET': '\033[0m'      # 重置
     }
     
+    def __init__(self, *args, **kwargs):
+        """初始化格式化器
+        
+        终端检测和各级别的着色名称只计算一次，避免每条日志重复处理。
+        """
+        super().__init__(*args, **kwargs)
+        
+        # 是否输出颜色（仅在终端输出时）
+        self._use_color = hasattr(sys.stderr, 'isatty') and sys.stderr.isatty()
+        
+        # 预先生成带颜色的级别名称
+        reset = self.COLORS['RESET']
+        self._colored_levels = {
+            level_name: f"{color}{level_name}{reset}"
+            for level_name, color in self.COLORS.items()
+            if level_name != 'RESET'
+        }
+    
     def format(self, record):
         """格式化日志记录
         
@@ -46,20 +86,80 @@ class ColoredFormatter(logging.Formatter):
         Returns:
             str: 格式化后的日志字符串
         """
-        # 获取原始格式化结果
-        log_message = super().format(record)
-        
-        # 添加颜色（仅在终端输出时）
-        if hasattr(sys.stderr, 'isatty') and sys.stderr.isatty():
-            level_name = record.levelname
-            color = self.COLORS.get(level_name, self.COLORS['RESET'])
-            reset = self.COLORS['RESET']
-            
-            # 为级别名称添加颜色
-            colored_level = f"{color}{level_name}{reset}"
-            log_message = log_message.replace(level_name, colored_level, 1)
+        if not self._use_color:
+            return super().format(record)
+        
+        # 临时替换为带颜色的级别名称，记录可能还会交给其他处理器，格式化后需恢复
+        level_name = record.levelname
+        record.levelname = self._colored_levels.get(level_name, level_name)
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = level_name
+
+
+class AsyncRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """后台轮转的日志文件处理器
+    
+    轮转时只在当前线程把日志文件原子重命名为临时名称并打开新文件，
+    备份文件的逐个重命名交给后台线程，写日志不会因轮转而停顿。
+    """
+    
+    def __init__(self, *args, **kwargs):
+        """初始化处理器，参数与 RotatingFileHandler 相同"""
+        super().__init__(*args, **kwargs)
+        # 单线程执行，保证多次轮转按顺序完成
+        self._rotation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-rotation')
+    
+    def doRollover(self) -> None:
+        """执行日志轮转"""
+        if self.backupCount <= 0:
+            super().doRollover()
+            return
+        
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        
+        # 当前日志文件先移到临时名称，原路径立即可以打开新文件继续写入
+        # （临时名称全局唯一，不会覆盖之前进程异常退出时遗留的文件）
+        pending_name = f"{self.baseFilename}.rotating-{uuid.uuid4().hex}"
+        if os.path.exists(self.baseFilename):
+            os.replace(self.baseFilename, pending_name)
+            try:
+                self._rotation_executor.submit(self._shift_backups, pending_name)
+            except RuntimeError:
+                # 解释器退出阶段（如 atexit 中写出剩余日志）不能再提交后台任务，直接同步完成
+                self._shift_backups(pending_name)
+        
+        if not self.delay:
+            self.stream = self._open()
+    
+    def _shift_backups(self, pending_name: str) -> None:
+        """依次后移备份文件，并将轮转出的日志放到第一个备份位置
         
-        return log_message
+        Args:
+            pending_name: 轮转出的日志文件临时名称
+        """
+        try:
+            for i in range(self.backupCount - 1, 0, -1):
+                source = self.rotation_filename(f"{self.baseFilename}.{i}")
+                target = self.rotation_filename(f"{self.baseFilename}.{i + 1}")
+                if os.path.exists(source):
+                    os.replace(source, target)
+            target = self.rotation_filename(f"{self.baseFilename}.1")
+            if callable(self.rotator):
+                self.rotator(pending_name, target)
+            else:
+                # os.rename 在 Windows 上不能覆盖已存在的 .1 备份
+                os.replace(pending_name, target)
+        except OSError as e:
+            sys.stderr.write(f"日志轮转失败: {e}\n")
+    
+    def close(self) -> None:
+        """关闭处理器，等待后台轮转完成"""
+        self._rotation_executor.shutdown(wait=True)
+        super().close()
 
 
 class MarkItDownLogger:
@@ -105,11 +205,16 @@ class MarkItDownLogger:
             self._setup_handlers()
     
     def _setup_handlers(self) -> None:
-        """设置日志处理器"""
+        """设置日志处理器
+        
+        控制台和文件处理器由后台监听线程执行，日志器上只挂一个入队的
+        QueueHandler，调用方不会阻塞在写文件和日志轮转上。
+        """
+        handlers = []
+        
         # 控制台处理器
         if self.console_output:
-            console_handler = self._create_console_handler()
-            self.logger.addHandler(console_handler)
+            handlers.append(self._create_console_handler())
         
         # 文件处理器
         if self.file_output:
@@ -123,11 +228,49 @@ class MarkItDownLogger:
             # 确保日志文件目录存在
             log_file_path.parent.mkdir(parents=True, exist_ok=True)
             
-            file_handler = self._create_file_handler(
+            handlers.append(self._create_file_handler(
                 log_file_path,
                 level=logging.DEBUG
-            )
-            self.logger.addHandler(file_handler)
+            ))
+        
+        if not handlers:
+            return
+        
+        log_queue = queue.Queue(-1)
+        listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # 记录对应的监听器，便于同名日志器的其他管理器实例调整处理器
+        queue_handler.listener = listener
+        self.logger.addHandler(queue_handler)
+        
+        listener.start()
+        # 退出时停止监听线程并写完队列中剩余的日志
+        atexit.register(listener.stop)
+    
+    def _get_listener(self) -> Optional[logging.handlers.QueueListener]:
+        """获取日志器对应的队列监听器
+        
+        Returns:
+            Optional[logging.handlers.QueueListener]: 队列监听器，未使用队列时为 None
+        """
+        for handler in self.logger.handlers:
+            listener = getattr(handler, 'listener', None)
+            if isinstance(handler, logging.handlers.QueueHandler) and listener is not None:
+                return listener
+        return None
+    
+    def _get_output_handlers(self) -> List[logging.Handler]:
+        """获取实际输出日志的处理器（包括队列监听器中的处理器）
+        
+        Returns:
+            List[logging.Handler]: 处理器列表
+        """
+        listener = self._get_listener()
+        handlers = [h for h in self.logger.handlers if not isinstance(h, logging.handlers.QueueHandler)]
+        if listener is not None:
+            handlers.extend(listener.handlers)
+        return handlers
     
     def _create_file_handler(self, log_file: Path, level: int) -> logging.Handler:
         """创建文件日志处理器
@@ -139,8 +282,8 @@ class MarkItDownLogger:
         Returns:
             logging.Handler: 文件处理器
         """
-        # 使用轮转文件处理器
-        handler = logging.handlers.RotatingFileHandler(
+        # 使用后台轮转的文件处理器
+        handler = AsyncRotatingFileHandler(
             filename=log_file,
             maxBytes=self.max_bytes,
             backupCount=self.backup_count,
@@ -215,7 +358,7 @@ class MarkItDownLogger:
         self.logger.setLevel(level)
         
         # 同时设置所有处理器的级别
-        for handler in self.logger.handlers:
+        for handler in self._get_output_handlers():
             if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
                 # 控制台处理器
                 handler.setLevel(level)
@@ -228,31 +371,50 @@ class MarkItDownLogger:
             level: 日志级别
         """
         handler = self._create_file_handler(Path(log_file), level)
-        self.logger.addHandler(handler)
+        
+        listener = self._get_listener()
+        if listener is not None:
+            listener.handlers = listener.handlers + (handler,)
+        else:
+            self.logger.addHandler(handler)
     
     def remove_console_output(self) -> None:
         """移除控制台输出"""
+        def is_console_handler(handler: logging.Handler) -> bool:
+            return isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler)
+        
         handlers_to_remove = []
         for handler in self.logger.handlers:
-            if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+            if is_console_handler(handler):
                 handlers_to_remove.append(handler)
         
         for handler in handlers_to_remove:
             self.logger.removeHandler(handler)
+        
+        listener = self._get_listener()
+        if listener is not None:
+            # 先停止监听器输出完已入队的日志，再移除控制台处理器
+            listener.stop()
+            listener.handlers = tuple(h for h in listener.handlers if not is_console_handler(h))
+            listener.start()
     
     def log_system_info(self) -> None:
         """记录系统信息"""
-        import platform
-        import psutil
+        system, release, python_version, cpu_count = _get_static_system_info()
         
         self.logger.info("=" * 50)
         self.logger.info("系统信息")
         self.logger.info("=" * 50)
-        self.logger.info(f"操作系统: {platform.system()} {platform.release()}")
-        self.logger.info(f"Python版本: {platform.python_version()}")
-        self.logger.info(f"CPU核心数: {psutil.cpu_count()}")
-        self.logger.info(f"内存总量: {psutil.virtual_memory().total / (1024**3):.1f} GB")
-        self.logger.info(f"可用内存: {psutil.virtual_memory().available / (1024**3):.1f} GB")
+        self.logger.info(f"操作系统: {system} {release}")
+        self.logger.info(f"Python版本: {python_version}")
+        self.logger.info(f"CPU核心数: {cpu_count}")
+        if psutil is not None:
+            # 内存信息会变化，每次读取一次即可
+            memory = psutil.virtual_memory()
+            self.logger.info(f"内存总量: {memory.total / (1024**3):.1f} GB")
+            self.logger.info(f"可用内存: {memory.available / (1024**3):.1f} GB")
+        else:
+            self.logger.warning("未安装 psutil，跳过内存信息")
         self.logger.info("=" * 50)
     
     def log_config_info(self, config_dict: dict = None) -> None:
@@ -304,11 +466,11 @@ class MarkItDownLogger:
         self.logger.info(f"平均处理时间: {avg_time_per_file:.2f} 秒/文件")
 
 
-# 全局日志管理器实例
-_logger_instance: Optional[MarkItDownLogger] = None
+# 项目日志器名称，其他模块的日志器作为其子日志器，通过传播共用处理器
+_BASE_LOGGER_NAME = 'markitdown'
 
 
-def setup_logger(level: int = logging.INFO, name: str = 'markitdown') -> logging.Logger:
+def setup_logger(level: int = logging.INFO, name: str = _BASE_LOGGER_NAME) -> logging.Logger:
     """设置并获取日志器
     
     Args:
@@ -318,27 +480,78 @@ def setup_logger(level: int = logging.INFO, name: str = 'markitdown') -> logging
     Returns:
         logging.Logger: 配置好的日志器
     """
-    global _logger_instance
-    
-    if _logger_instance is None:
-        _logger_instance = MarkItDownLogger(name)
-    
-    _logger_instance.set_level(level)
-    return _logger_instance.get_logger()
+    # 日志器已有处理器时 MarkItDownLogger 不会重复添加
+    manager = MarkItDownLogger(name)
+    manager.set_level(level)
+    return manager.get_logger()
 
 
-def get_logger(name: str = 'markitdown') -> logging.Logger:
+def get_logger(name: str = _BASE_LOGGER_NAME) -> logging.Logger:
     """获取日志器实例
     
     Args:
-        name: 日志器名称
+        name: 日志器名称，非项目日志器的名称会挂到项目日志器之下
         
     Returns:
         logging.Logger: 日志器实例
     """
-    if _logger_instance is None:
-        return setup_logger(name=name)
-    return _logger_instance.get_logger()
+    if name != _BASE_LOGGER_NAME and not name.startswith(_BASE_LOGGER_NAME + '.'):
+        name = f"{_BASE_LOGGER_NAME}.{name}"
+    
+    # 首次使用时配置项目日志器
+    if not logging.getLogger(_BASE_LOGGER_NAME).handlers:
+        setup_logger()
+    
+    # logging 模块按名称缓存日志器实例
+    return logging.getLogger(name)
+
+
+class _ForwardingHandler(logging.Handler):
+    """将其他进程传来的日志记录交给本进程同名日志器处理"""
+    
+    def handle(self, record: logging.LogRecord) -> bool:
+        logging.getLogger(record.name).handle(record)
+        return True
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
+
+
+def start_worker_log_listener(log_queue) -> logging.handlers.QueueListener:
+    """在主进程中启动监听器，接收工作进程通过队列发送的日志
+    
+    Args:
+        log_queue: 与工作进程共享的 multiprocessing 队列
+        
+    Returns:
+        logging.handlers.QueueListener: 已启动的监听器，使用完毕后调用 stop()
+    """
+    # 确保主进程的项目日志器已配置
+    get_logger()
+    
+    listener = logging.handlers.QueueListener(log_queue, _ForwardingHandler())
+    listener.start()
+    return listener
+
+
+def configure_worker_logging(log_queue, level: int) -> None:
+    """配置工作进程的日志：所有日志通过队列交给主进程输出
+    
+    工作进程不创建自己的控制台和文件处理器，避免多个进程同时写入和轮转
+    同一个日志文件。
+    
+    Args:
+        log_queue: 与主进程共享的 multiprocessing 队列
+        level: 主进程项目日志器的日志级别
+    """
+    base_logger = logging.getLogger(_BASE_LOGGER_NAME)
+    
+    # 以 fork 方式启动时会继承主进程的处理器，其后台监听线程在子进程中并不存在
+    for handler in list(base_logger.handlers):
+        base_logger.removeHandler(handler)
+    
+    base_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    base_logger.setLevel(level)
 
 
 def log_function_call(func):
@@ -9,17 +9,213 @@
 版本: 1.0.0
 """
 
+import functools
 import os
 import shutil
+import sys
+import tempfile
+import threading
 from pathlib import Path
-from typing import Union, List, Optional
+from typing import Iterable, Union, List, Optional, Tuple
 from datetime import datetime
 
 from .logger import get_logger
 from .config import Config
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 logger = get_logger(__name__)
 
+def _load_default_max_filename_length() -> int:
+    """
+    从配置中读取默认的文件名最大长度
+    
+    Returns:
+        文件名最大长度，配置缺失时为 255
+    """
+    try:
+        return Config.DIRECTORY_NAMING['filename_limits']['max_filename_length']
+    except (KeyError, TypeError):
+        return 255
+
+
+# 默认的文件名最大长度（配置在运行中修改后调用 reload_config 刷新）
+_DEFAULT_MAX_FILENAME_LENGTH = _load_default_max_filename_length()
+
+
+def reload_config() -> None:
+    """重新读取路径管理相关的配置"""
+    global _DEFAULT_MAX_FILENAME_LENGTH
+    _DEFAULT_MAX_FILENAME_LENGTH = _load_default_max_filename_length()
+
+
+# 本进程中已确保存在的目录（规范化后的路径字符串），避免重复的 mkdir 系统调用
+_ENSURED_DIRS = set()
+_ENSURED_DIRS_LOCK = threading.Lock()
+
+# 文件名安全化转换表：不安全字符替换为下划线，控制字符直接移除
+_UNSAFE_FILENAME_TABLE = str.maketrans({
+    **{char: '_' for char in '<>:"/\\|?*'},
+    **{chr(code): None for code in range(32)},
+})
+
+
+def _free_path(path: Path) -> Optional[Path]:
+    """
+    检查路径是否未被占用（失效的符号链接也视为占用）
+    
+    Args:
+        path: 要检查的路径
+        
+    Returns:
+        路径未被占用时返回该路径，否则返回 None
+    """
+    try:
+        os.lstat(path)
+    except FileNotFoundError:
+        return path
+    return None
+
+
+def _claim_path(path: Path) -> Optional[Tuple[Path, int]]:
+    """
+    以独占方式创建文件，文件已存在时返回 None
+    
+    Args:
+        path: 要创建的文件路径
+        
+    Returns:
+        (文件路径, 写文件描述符)，文件已存在时返回 None
+    """
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0), 0o644)
+    except FileExistsError:
+        return None
+    return path, fd
+
+
+# Linux 下写时复制（reflink）克隆文件的 ioctl 请求码
+_FICLONE = 0x40049409
+
+
+def _copy_file_data(src: Path, dst: Path) -> None:
+    """
+    复制文件内容和元数据（等价于 shutil.copy2）
+    
+    Linux 上优先尝试 FICLONE 共享数据块（btrfs/xfs 等支持时为 O(1)），
+    失败时回退到 shutil.copyfile（内核内复制，无需经过用户态缓冲）。
+    数据先写入目标目录中的临时文件，完成后再替换目标文件，
+    复制失败时不会破坏已有的目标文件。
+    
+    Args:
+        src: 源文件路径
+        dst: 目标文件路径或目标目录
+        
+    Raises:
+        shutil.SameFileError: 源文件和目标文件是同一个文件（包括硬链接、符号链接）
+    """
+    # 与 shutil.copy2 一致：目标是目录时复制到该目录下的同名文件
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    
+    dst_dir, dst_name = os.path.split(os.fspath(dst))
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{dst_name}.', suffix='.tmp', dir=dst_dir or None)
+    try:
+        cloned = False
+        with os.fdopen(fd, 'wb') as fdst:
+            if fcntl is not None and sys.platform == 'linux':
+                with open(src, 'rb') as fsrc:
+                    try:
+                        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+                        cloned = True
+                    except OSError:
+                        # 跨文件系统或不支持 reflink
+                        pass
+        
+        if not cloned:
+            shutil.copyfile(src, tmp_path)
+        shutil.copystat(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def forget_ensured_dir(dir_path: Union[str, Path]) -> None:
+    """
+    在删除目录后移除其（及子目录）已确保存在的记录
+    
+    Args:
+        dir_path: 被删除的目录路径
+    """
+    prefix = os.path.realpath(dir_path)
+    prefix_sep = prefix.rstrip(os.sep) + os.sep
+    with _ENSURED_DIRS_LOCK:
+        stale = [d for d in _ENSURED_DIRS if d == prefix or d.startswith(prefix_sep)]
+        _ENSURED_DIRS.difference_update(stale)
+
+
+def _resolve_path(base_dir: Path, path: str) -> Path:
+    """
+    将路径解析为绝对路径（解析路径中所有层级的符号链接）
+    
+    Args:
+        base_dir: 基础目录
+        path: 输入路径
+        
+    Returns:
+        解析后的绝对路径
+    """
+    resolved = Path(path)
+    
+    # 如果是相对路径，相对于基础目录
+    if not resolved.is_absolute():
+        resolved = base_dir / resolved
+    
+    return resolved.resolve()
+
+
+# 按基础目录和路径字符串缓存的解析结果（安全检查不使用缓存）
+_resolve = functools.lru_cache(maxsize=2048)(_resolve_path)
+
+
+def _walk_files(root: str) -> List[str]:
+    """
+    递归列出目录下的普通文件（不进入符号链接指向的目录）
+    
+    与 rglob('*') + is_file() 的结果一致：失效的符号链接、FIFO、套接字等不计入。
+    
+    Args:
+        root: 根目录
+        
+    Returns:
+        文件路径列表
+    """
+    files = []
+    pending = [root]
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file():
+                        files.append(entry.path)
+        except OSError:
+            # 与 os.walk 一致，忽略无法读取的目录
+            continue
+    return files
+
+
 class PathManager:
     """
     路径管理器
@@ -41,7 +237,7 @@ class PathManager:
         self.base_dir = Path(base_dir) if base_dir else Path.cwd()
         self.base_dir = self.base_dir.resolve()
         
-        logger.debug(f"PathManager 初始化，基础目录: {self.base_dir}")
+        logger.debug("PathManager 初始化，基础目录: %s", self.base_dir)
     
     def normalize_path(self, path: Union[str, Path]) -> Path:
         """
@@ -53,13 +249,10 @@ class PathManager:
         Returns:
             规范化后的 Path 对象
         """
-        path = Path(path)
-        
-        # 如果是相对路径，相对于基础目录
-        if not path.is_absolute():
-            path = self.base_dir / path
-        
-        return path.resolve()
+        return _resolve(self.base_dir, str(path))
+    
+    # 文件系统中的符号链接变化后，可调用 normalize_path.cache_clear() 清除解析缓存
+    normalize_path.cache_clear = _resolve.cache_clear
     
     def ensure_dir(self, dir_path: Union[str, Path], 
                    parents: bool = True, exist_ok: bool = True) -> Path:
@@ -75,10 +268,20 @@ class PathManager:
             创建的目录路径
         """
         dir_path = self.normalize_path(dir_path)
+        key = str(dir_path)
+        
+        # 允许目录已存在时，本进程已创建过且仍存在的目录直接返回
+        # （目录可能已被外部删除，因此仍用一次 isdir 确认，失效的记录需要移除）
+        if exist_ok and key in _ENSURED_DIRS:
+            if os.path.isdir(key):
+                return dir_path
+            forget_ensured_dir(key)
         
         try:
             dir_path.mkdir(parents=parents, exist_ok=exist_ok)
-            logger.debug(f"目录已确保存在: {dir_path}")
+            with _ENSURED_DIRS_LOCK:
+                _ENSURED_DIRS.add(key)
+            logger.debug("目录已确保存在: %s", dir_path)
             return dir_path
         except Exception as e:
             logger.error(f"创建目录失败 {dir_path}: {e}")
@@ -95,21 +298,39 @@ class PathManager:
         Returns:
             安全的文件名
         """
+        return self.safe_filenames([filename], max_length)[0]
+    
+    def safe_filenames(self, filenames: Iterable[str], max_length: int = None) -> List[str]:
+        """
+        批量生成安全的文件名
+        
+        Args:
+            filenames: 原始文件名序列
+            max_length: 最大长度，如果为None则使用配置中的默认值
+            
+        Returns:
+            安全的文件名列表，顺序与输入一致
+        """
         # 如果未指定最大长度，使用配置中的默认值
         if max_length is None:
-            # 从配置中获取默认值
-            max_length = Config.DIRECTORY_NAMING['filename_limits']['max_filename_length']
-        
-        # 移除或替换不安全的字符
-        unsafe_chars = '<>:"/\\|?*'
-        safe_name = filename
-        
-        for char in unsafe_chars:
-            safe_name = safe_name.replace(char, '_')
+            max_length = _DEFAULT_MAX_FILENAME_LENGTH
         
-        # 移除控制字符
-        safe_name = ''.join(char for char in safe_name if ord(char) >= 32)
+        # 替换不安全的字符并移除控制字符（单次遍历）
+        return [self._limit_filename(filename.translate(_UNSAFE_FILENAME_TABLE), max_length)
+                for filename in filenames]
+    
+    @staticmethod
+    def _limit_filename(safe_name: str, max_length: int) -> str:
+        """
+        限制文件名长度并确保不为空
         
+        Args:
+            safe_name: 已替换不安全字符的文件名
+            max_length: 最大长度
+            
+        Returns:
+            处理后的文件名
+        """
         # 限制长度
         if len(safe_name) > max_length:
             name_part, ext_part = os.path.splitext(safe_name)
@@ -123,21 +344,27 @@ class PathManager:
         return safe_name
     
     def generate_unique_path(self, base_path: Union[str, Path], 
-                           suffix: str = None) -> Path:
+                           suffix: str = None,
+                           create: bool = False) -> Union[Path, Tuple[Path, int]]:
         """
         生成唯一的文件路径
         
         Args:
             base_path: 基础路径
             suffix: 后缀（如果文件已存在）
+            create: 是否以独占方式原子地创建该文件，避免检查与使用之间的竞争
             
         Returns:
-            唯一的文件路径
+            唯一的文件路径；create 为 True 时返回 (文件路径, 已打开的写文件描述符)，
+            文件描述符由调用方负责关闭
         """
         base_path = self.normalize_path(base_path)
         
-        if not base_path.exists():
-            return base_path
+        claim = _claim_path if create else _free_path
+        
+        result = claim(base_path)
+        if result is not None:
+            return result
         
         # 文件已存在，生成唯一名称
         stem = base_path.stem
@@ -151,9 +378,9 @@ class PathManager:
             else:
                 new_name = f"{stem}{suffix_part}_{counter}{ext}"
             
-            new_path = base_path.parent / new_name
-            if not new_path.exists():
-                return new_path
+            result = claim(base_path.parent / new_name)
+            if result is not None:
+                return result
             
             counter += 1
             if counter > 1000:  # 防止无限循环
@@ -171,7 +398,8 @@ class PathManager:
         Returns:
             路径是否安全
         """
-        path = self.normalize_path(path)
+        # 安全检查必须反映文件系统的当前状态，不使用缓存的解析结果
+        path = _resolve_path(self.base_dir, str(path))
         
         # 检查是否在基础目录内
         try:
@@ -182,7 +410,7 @@ class PathManager:
         
         # 检查是否在允许的目录内
         if allowed_dirs:
-            allowed_paths = [self.normalize_path(d) for d in allowed_dirs]
+            allowed_paths = [_resolve_path(self.base_dir, str(d)) for d in allowed_dirs]
             for allowed_path in allowed_paths:
                 try:
                     path.relative_to(allowed_path)
@@ -212,17 +440,24 @@ class PathManager:
             return 0
         
         deleted_count = 0
-        
-        # 从最深层开始删除
-        for dir_path in sorted(root_dir.rglob('*'), key=lambda p: len(p.parts), reverse=True):
-            if dir_path.is_dir() and not any(dir_path.iterdir()):
-                if not keep_root or dir_path != root_dir:
-                    try:
-                        dir_path.rmdir()
-                        deleted_count += 1
-                        logger.debug(f"删除空目录: {dir_path}")
-                    except Exception as e:
-                        logger.warning(f"删除空目录失败 {dir_path}: {e}")
+        root_str = str(root_dir)
+        removed_dirs = set()
+        
+        # 自底向上遍历，子目录总是先于父目录处理
+        for dir_path, dir_names, file_names in os.walk(root_str, topdown=False):
+            # dir_names 仍包含本轮已删除的子目录，需排除后再判断是否为空
+            if file_names or any(os.path.join(dir_path, name) not in removed_dirs for name in dir_names):
+                continue
+            if keep_root and dir_path == root_str:
+                continue
+            try:
+                os.rmdir(dir_path)
+                removed_dirs.add(dir_path)
+                forget_ensured_dir(dir_path)
+                deleted_count += 1
+                logger.debug("删除空目录: %s", dir_path)
+            except Exception as e:
+                logger.warning(f"删除空目录失败 {dir_path}: {e}")
         
         return deleted_count
     
@@ -252,8 +487,8 @@ class PathManager:
         self.ensure_dir(dst.parent)
         
         try:
-            shutil.copy2(src, dst)
-            logger.debug(f"文件复制成功: {src} -> {dst}")
+            _copy_file_data(src, dst)
+            logger.debug("文件复制成功: %s -> %s", src, dst)
             return dst
         except Exception as e:
             logger.error(f"文件复制失败 {src} -> {dst}: {e}")
@@ -286,7 +521,7 @@ class PathManager:
         
         try:
             shutil.move(str(src), str(dst))
-            logger.debug(f"文件移动成功: {src} -> {dst}")
+            logger.debug("文件移动成功: %s -> %s", src, dst)
             return dst
         except Exception as e:
             logger.error(f"文件移动失败 {src} -> {dst}: {e}")
@@ -340,6 +575,13 @@ class PathManager:
         if not directory.exists() or not directory.is_dir():
             return []
         
+        # 匹配全部文件时直接遍历目录，DirEntry 已缓存类型信息，无需逐个 stat
+        if pattern == '*':
+            if recursive:
+                return [Path(path) for path in _walk_files(str(directory))]
+            with os.scandir(directory) as entries:
+                return [Path(entry.path) for entry in entries if entry.is_file()]
+        
         if recursive:
             files = list(directory.rglob(pattern))
         else:
@@ -17,14 +17,42 @@ Date: 2025-01-27
 """
 
 import os
+import string
+import functools
+import threading
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Dict, Optional, Set, Tuple, Union
 
 from ..config import Config
 from ..logger import get_logger
+from ..path_manager import forget_ensured_dir
 from .filename_normalizer import FilenameNormalizer
 
 
+# 名称清理时替换为下划线的不安全字符
+_UNSAFE_CHARS = '<>:"/\\|?*'
+
+# 目录名最大长度（首次使用时从配置读取）
+_MAX_DIR_NAME_LENGTH: Optional[int] = None
+
+# 超长名称截断参数：(保留头部长度, 连接符, 保留尾部长度)，随最大长度一起计算
+_TRUNCATION: Tuple[int, str, int] = (255, '', 0)
+
+# 目录结构模板允许使用的字段
+_TEMPLATE_FIELDS = frozenset({'base_dir', 'doc_name', 'doc_type', 'year', 'month'})
+_TEMPLATE_TEST_VALUES = {
+    'base_dir': 'test',
+    'doc_name': 'test_doc',
+    'doc_type': 'pdf',
+    'year': '2025',
+    'month': '01'
+}
+_TEMPLATE_FORMATTER = string.Formatter()
+
+# 预解析的目录结构模板：模板字符串 -> ((文本或字段名, 是否字段), ...)
+_COMPILED_TEMPLATES: Dict[str, Optional[Tuple[Tuple[str, bool], ...]]] = {}
+
+
 class DirectoryManager:
     """
     统一的目录命名和管理器
@@ -33,11 +61,31 @@ class DirectoryManager:
     支持灵活的命名策略和模板系统。
     """
     
+    # 本进程中已创建的图片目录，避免每张图片都重复 mkdir
+    _created_dirs: Set[str] = set()
+    _created_dirs_lock = threading.Lock()
+    
+    # 类方法共用的实例（首次使用时创建）
+    _INSTANCE: Optional['DirectoryManager'] = None
+    
     def __init__(self):
         """初始化目录管理器"""
         self.logger = get_logger()
         self.config = Config.DIRECTORY_NAMING
     
+    @classmethod
+    def _get(cls) -> 'DirectoryManager':
+        """
+        获取类方法共用的目录管理器实例
+        
+        Returns:
+            DirectoryManager: 共用实例
+        """
+        instance = cls._INSTANCE
+        if instance is None:
+            instance = cls._INSTANCE = cls()
+        return instance
+    
     @classmethod
     def get_image_directory_path(cls, doc_name: str, doc_type: str = 'default', 
                                 base_dir: Optional[str] = None) -> Path:
@@ -52,8 +100,7 @@ class DirectoryManager:
         Returns:
             Path: 生成的图片目录路径
         """
-        manager = cls()
-        return manager._generate_directory_path(doc_name, doc_type, base_dir)
+        return Path(cls._get()._generate_directory_path(doc_name, doc_type, base_dir))
     
     @classmethod
     def create_document_image_dir(cls, doc_name: str, doc_type: str = 'default', 
@@ -69,14 +116,33 @@ class DirectoryManager:
         Returns:
             Path: 创建的图片目录路径
         """
-        manager = cls()
+        manager = cls._get()
         dir_path = manager._generate_directory_path(doc_name, doc_type, base_dir)
         
-        # 创建目录
-        dir_path.mkdir(parents=True, exist_ok=True)
-        manager.logger.debug(f"创建图片目录: {dir_path}")
+        # 创建目录（本进程已创建过的目录不再重复创建）
+        # 目录可能已被其他代码删除（如 PathManager.clean_empty_dirs），因此仍用一次 isdir 确认
+        key = os.path.normpath(dir_path)
+        if key not in cls._created_dirs or not os.path.isdir(key):
+            os.makedirs(dir_path, exist_ok=True)
+            with cls._created_dirs_lock:
+                cls._created_dirs.add(key)
+            manager.logger.debug("创建图片目录: %s", dir_path)
+        
+        return Path(dir_path)
+    
+    @classmethod
+    def forget_created_dir(cls, dir_path: Union[str, Path]) -> None:
+        """
+        目录被删除或移走后，移除其（及子目录）已创建的记录
         
-        return dir_path
+        Args:
+            dir_path: 被删除的目录路径
+        """
+        prefix = os.path.normpath(dir_path)
+        prefix_sep = prefix.rstrip(os.sep) + os.sep
+        with cls._created_dirs_lock:
+            stale = [d for d in cls._created_dirs if d == prefix or d.startswith(prefix_sep)]
+            cls._created_dirs.difference_update(stale)
     
     @classmethod
     def normalize_directory_name(cls, name: str, doc_type: str = 'default') -> str:
@@ -90,26 +156,57 @@ class DirectoryManager:
         Returns:
             str: 规范化后的目录名
         """
-        manager = cls()
-        return manager._normalize_name(name, doc_type)
+        return cls._get()._normalize_name(name, doc_type)
     
     def _generate_directory_path(self, doc_name: str, doc_type: str, 
-                                base_dir: Optional[str]) -> Path:
+                                base_dir: Optional[str]) -> str:
         """
         生成目录路径的内部方法
         
+        结果按文档名、类型、基础目录和相关配置缓存。内部统一使用字符串路径，
+        只在公开接口处转换为 Path。
+        
         Args:
             doc_name: 文档名称
             doc_type: 文档类型
             base_dir: 基础目录
             
         Returns:
-            Path: 生成的目录路径
+            str: 生成的目录路径
         """
-        # 获取基础目录
+        image_config = self.config['image_directories']
+        
+        # 获取基础目录（统一为字符串，兼容传入 Path）
         if base_dir is None:
-            base_dir = self.config['image_directories']['base_dir']
+            base_dir = image_config['base_dir']
+        base_dir = str(base_dir)
         
+        type_config = self.config['document_type_configs'].get(doc_type.lower(), {})
+        
+        return _generate_directory_path_cached(
+            doc_name,
+            doc_type,
+            base_dir,
+            image_config['structure_template'],
+            image_config['naming_strategy'],
+            Config.FILENAME_NORMALIZATION['enabled'],
+            Config.FILENAME_NORMALIZATION.get('convert_chinese_to_pinyin', True),
+            self._get_max_dir_name_length(),
+            type_config.get('dir_prefix', '')
+        )
+    
+    def _build_directory_path(self, doc_name: str, doc_type: str, base_dir: str) -> str:
+        """
+        生成目录路径的实际计算（不使用缓存）
+        
+        Args:
+            doc_name: 文档名称
+            doc_type: 文档类型
+            base_dir: 基础目录
+            
+        Returns:
+            str: 生成的目录路径
+        """
         # 规范化文档名
         normalized_doc_name = self._normalize_name(doc_name, doc_type)
         
@@ -119,21 +216,43 @@ class DirectoryManager:
         # 生成完整路径
         template = self.config['image_directories']['structure_template']
         
-        # 替换模板变量
-        path_str = template.format(
-            base_dir=base_dir,
-            doc_name=final_doc_name,
-            doc_type=doc_type
-        )
+        # 替换模板变量（使用预解析的模板，避免每次重新解析格式串）
+        path_str = _format_template(template, {
+            'base_dir': base_dir,
+            'doc_name': final_doc_name,
+            'doc_type': doc_type
+        })
         
-        return Path(path_str)
+        return path_str
     
     def _normalize_name(self, name: str, doc_type: str) -> str:
-        self.logger.debug(f"Normalizing directory name: '{name}', doc_type: {doc_type}")
-
         """
         规范化名称的内部方法
         
+        结果按名称和相关配置缓存，同一文档的多次调用只计算一次。
+        
+        Args:
+            name: 原始名称
+            doc_type: 文档类型
+            
+        Returns:
+            str: 规范化后的名称
+        """
+        self.logger.debug("Normalizing directory name: %r, doc_type: %s", name, doc_type)
+        
+        return _normalize_name_cached(
+            name,
+            doc_type,
+            self.config['image_directories']['naming_strategy'],
+            Config.FILENAME_NORMALIZATION['enabled'],
+            Config.FILENAME_NORMALIZATION.get('convert_chinese_to_pinyin', True),
+            self._get_max_dir_name_length()
+        )
+    
+    def _compute_normalized_name(self, name: str, doc_type: str) -> str:
+        """
+        规范化名称的实际计算（不使用缓存）
+        
         Args:
             name: 原始名称
             doc_type: 文档类型
@@ -155,7 +274,7 @@ class DirectoryManager:
                 
                 # 目录名和文件名使用相同的规范化结果，不再应用额外的长度限制
                 # 确保目录名和文件名保持一致
-                self.logger.debug(f"Normalized directory name: '{temp_filename}'")
+                self.logger.debug("Normalized directory name: %r", temp_filename)
                 return temp_filename
             else:
                 result = self._sanitize_name(name)
@@ -207,27 +326,26 @@ class DirectoryManager:
         Returns:
             str: 清理后的名称
         """
-        import re
-        
         # 注意：传入的name应该已经是不带扩展名的文档名，
         # 不应该再使用Path.stem，否则会错误地将包含'.'的文档名截断
         # 例如：'EDC建库端_V1.0_用户手册' 会被错误截断为 'EDC建库端_V1'
         
         # 替换不安全字符
-        safe_name = re.sub(r'[<>:"/\\|?*]', '_', name)
-        safe_name = re.sub(r'[\s_]+', '_', safe_name).strip('_')
+        safe_name = name
+        for char in _UNSAFE_CHARS:
+            if char in safe_name:
+                safe_name = safe_name.replace(char, '_')
+        
+        # 连续的空白和下划线合并为一个下划线，并去掉首尾下划线
+        safe_name = '_'.join(filter(None, '_'.join(safe_name.split()).split('_')))
         
         # 应用目录名长度限制（使用更宽松的长度限制）
         max_length = self._get_max_dir_name_length()
-        if len(safe_name) > max_length:
-            # 智能截断：保留前后部分，中间用...连接
-            if max_length > 10:
-                # 保留前一半和后一半，中间用...连接
-                half = (max_length - 3) // 2
-                safe_name = safe_name[:half] + '...' + safe_name[-(max_length - half - 3):]
-            else:
-                # 如果限制太短，直接截断
-                safe_name = safe_name[:max_length]
+        length = len(safe_name)
+        if length > max_length:
+            # 智能截断：保留前后部分，中间用...连接（限制太短时直接截断）
+            head, separator, tail = _TRUNCATION
+            safe_name = safe_name[:head] + separator + safe_name[length - tail:]
         
         return safe_name
     
@@ -238,14 +356,34 @@ class DirectoryManager:
         Returns:
             int: 目录名最大长度
         """
-        # 直接使用配置中的目录名长度限制
-        max_length = Config.DIRECTORY_NAMING.get('image_directories', {}).get('max_dir_name_length', 255)
-        
-        # 确保长度限制合理
-        if max_length < 50:
-            max_length = 255  # 使用更合理的默认值
+        global _MAX_DIR_NAME_LENGTH, _TRUNCATION
+        if _MAX_DIR_NAME_LENGTH is None:
+            # 直接使用配置中的目录名长度限制
+            max_length = Config.DIRECTORY_NAMING.get('image_directories', {}).get('max_dir_name_length', 255)
+            
+            # 确保长度限制合理
+            if max_length < 50:
+                max_length = 255  # 使用更合理的默认值
+            
+            # 预先计算截断时保留的前后长度
+            if max_length > 10:
+                head = (max_length - 3) // 2
+                _TRUNCATION = (head, '...', max_length - head - 3)
+            else:
+                _TRUNCATION = (max_length, '', 0)
+            
+            _MAX_DIR_NAME_LENGTH = max_length
         
-        return max_length
+        return _MAX_DIR_NAME_LENGTH
+    
+    @classmethod
+    def invalidate_config_cache(cls) -> None:
+        """清除缓存的配置值，配置修改后调用"""
+        global _MAX_DIR_NAME_LENGTH
+        _MAX_DIR_NAME_LENGTH = None
+        # 共用实例持有配置引用，配置修改后重新创建
+        DirectoryManager._INSTANCE = None
+        FilenameNormalizer.invalidate_config_cache()
     
     def _custom_normalize(self, name: str, doc_type: str) -> str:
         """
@@ -258,18 +396,9 @@ class DirectoryManager:
         Returns:
             str: 自定义规范化后的名称
         """
-        # 这里可以实现自定义的规范化逻辑
-        # 例如：根据文档类型使用不同的规范化规则
-        
-        if doc_type.lower() == 'pdf':
-            # PDF文档的特殊处理
-            return self._sanitize_name(name)
-        elif doc_type.lower() == 'docx':
-            # Word文档的特殊处理
-            return self._sanitize_name(name)
-        else:
-            # 默认处理
-            return self._sanitize_name(name)
+        # 扩展点：目前所有文档类型都使用基本清理规则，
+        # 需要按文档类型（pdf、docx等）定制规则时在此处分派
+        return self._sanitize_name(name)
     
     @classmethod
     def get_supported_templates(cls) -> Dict[str, str]:
@@ -298,19 +427,26 @@ class DirectoryManager:
         Returns:
             bool: 模板是否有效
         """
+        # 先解析模板检查字段名（格式说明中嵌套的字段也要检查）
+        pending = [template]
+        try:
+            while pending:
+                for _, field, format_spec, _ in _TEMPLATE_FORMATTER.parse(pending.pop()):
+                    if field is None:
+                        continue
+                    if field.split('.', 1)[0].split('[', 1)[0] not in _TEMPLATE_FIELDS:
+                        return False
+                    if format_spec:
+                        pending.append(format_spec)
+        except ValueError:
+            return False
+        
+        # 再用示例值试格式化一次，捕获无效的转换符（如 !x）和格式说明（如 :d）
         try:
-            # 尝试格式化模板
-            test_vars = {
-                'base_dir': 'test',
-                'doc_name': 'test_doc',
-                'doc_type': 'pdf',
-                'year': '2025',
-                'month': '01'
-            }
-            template.format(**test_vars)
-            return True
-        except (KeyError, ValueError) as e:
+            template.format(**_TEMPLATE_TEST_VALUES)
+        except (KeyError, IndexError, AttributeError, TypeError, ValueError):
             return False
+        return True
     
     def cleanup_empty_directories(self, base_path: Union[str, Path]) -> int:
         """
@@ -329,12 +465,21 @@ class DirectoryManager:
             if not base_path.exists():
                 return 0
             
-            # 递归清理空目录
-            for dir_path in base_path.rglob('*'):
-                if dir_path.is_dir() and not any(dir_path.iterdir()):
-                    dir_path.rmdir()
-                    cleaned_count += 1
-                    self.logger.debug(f"删除空目录: {dir_path}")
+            # 自底向上递归清理空目录，子目录清空后其父目录在同一次遍历中即可删除
+            base_str = str(base_path)
+            removed_dirs = set()
+            for dir_path, dir_names, file_names in os.walk(base_str, topdown=False):
+                if dir_path == base_str:
+                    continue
+                # dir_names 仍包含本轮已删除的子目录，需排除后再判断是否为空
+                if file_names or any(os.path.join(dir_path, name) not in removed_dirs for name in dir_names):
+                    continue
+                os.rmdir(dir_path)
+                removed_dirs.add(dir_path)
+                forget_ensured_dir(dir_path)
+                self.forget_created_dir(dir_path)
+                cleaned_count += 1
+                self.logger.debug(f"删除空目录: {dir_path}")
             
             self.logger.info(f"清理完成，删除了 {cleaned_count} 个空目录")
             
@@ -344,6 +489,111 @@ class DirectoryManager:
         return cleaned_count
 
 
+@functools.lru_cache(maxsize=4096)
+def _normalize_name_cached(name: str, doc_type: str, strategy: str, normalization_enabled: bool,
+                           convert_pinyin: bool, max_dir_name_length: int) -> str:
+    """
+    按名称和影响结果的配置缓存目录名规范化结果
+    
+    配置项只用作缓存键，配置变化后会重新计算。
+    
+    Args:
+        name: 原始名称
+        doc_type: 文档类型
+        strategy: 命名策略
+        normalization_enabled: 是否启用文件名规范化
+        convert_pinyin: 是否进行中文转拼音
+        max_dir_name_length: 目录名最大长度
+        
+    Returns:
+        str: 规范化后的名称
+    """
+    return DirectoryManager._get()._compute_normalized_name(name, doc_type)
+
+
+def _compile_template(template: str) -> Optional[Tuple[Tuple[str, bool], ...]]:
+    """
+    将目录模板解析为文本片段和字段名的序列
+    
+    Args:
+        template: 模板字符串
+        
+    Returns:
+        Optional[Tuple]: 解析结果；包含格式说明、转换符或复杂字段时返回 None
+    """
+    parts = []
+    try:
+        for literal, field, format_spec, conversion in _TEMPLATE_FORMATTER.parse(template):
+            if literal:
+                parts.append((literal, False))
+            if field is not None:
+                # 只处理简单字段，其余情况交给 str.format
+                if format_spec or conversion or not field.isidentifier():
+                    return None
+                parts.append((field, True))
+    except ValueError:
+        return None
+    return tuple(parts)
+
+
+def _format_template(template: str, values: Dict[str, str]) -> str:
+    """
+    使用预解析的模板生成字符串，结果与 template.format(**values) 一致
+    
+    Args:
+        template: 模板字符串
+        values: 模板变量
+        
+    Returns:
+        str: 替换后的字符串
+    """
+    try:
+        compiled = _COMPILED_TEMPLATES[template]
+    except KeyError:
+        compiled = _COMPILED_TEMPLATES[template] = _compile_template(template)
+    
+    if compiled is None:
+        return template.format(**values)
+    
+    try:
+        return ''.join(values[text] if is_field else text for text, is_field in compiled)
+    except KeyError:
+        # 缺少模板变量时保持 str.format 的异常行为
+        return template.format(**values)
+
+
+# 预先解析内置模板
+for _template in DirectoryManager.get_supported_templates().values():
+    _COMPILED_TEMPLATES[_template] = _compile_template(_template)
+del _template
+
+
+@functools.lru_cache(maxsize=1024)
+def _generate_directory_path_cached(doc_name: str, doc_type: str, base_dir: str, template: str,
+                                    strategy: str, normalization_enabled: bool, convert_pinyin: bool,
+                                    max_dir_name_length: int, dir_prefix: str) -> str:
+    """
+    按文档名、类型、基础目录和影响结果的配置缓存图片目录路径
+    
+    配置项只用作缓存键，配置变化后会重新计算。
+    
+    Args:
+        doc_name: 文档名称
+        doc_type: 文档类型
+        base_dir: 基础目录
+        template: 目录结构模板
+        strategy: 命名策略
+        normalization_enabled: 是否启用文件名规范化
+        convert_pinyin: 是否进行中文转拼音
+        max_dir_name_length: 目录名最大长度
+        dir_prefix: 文档类型目录前缀
+        
+    Returns:
+        str: 生成的目录路径
+    """
+    return DirectoryManager._get()._build_directory_path(doc_name, doc_type, base_dir)
+
+
 if __name__ == '__main__':
     # 测试目录管理器
     manager = DirectoryManager()
@@ -11,13 +11,26 @@ Date: 2025-01-01
 
 import re
 import os
+import functools
 import logging
 from typing import Dict, Optional
-from pypinyin import lazy_pinyin, Style
 
 
 logger = logging.getLogger(__name__)
 
+# 规范化过程中使用的正则表达式（预编译）
+_MULTI_UNDERSCORE_RE = re.compile(r'_+')
+_MULTI_DOT_RE = re.compile(r'\.+')
+_CJK_SEGMENT_RE = re.compile(r'[\u4e00-\u9fff]+|[^\u4e00-\u9fff]+')
+_ALT_TEXT_STRIP_RE = re.compile(r'[^a-zA-Z0-9_\u4e00-\u9fff]')
+
+# 文件名最大长度（首次使用时从配置读取）
+_MAX_FILENAME_LENGTH: Optional[int] = None
+
+# pypinyin 延迟导入（首次遇到中文时加载）
+_lazy_pinyin = None
+_pinyin_style = None
+
 class FilenameNormalizer:
     """
     文件名规范化工具类
@@ -55,6 +68,10 @@ class FilenameNormalizer:
         '\r': '_'
     }
     
+    # 由替换映射预先生成的转换表，一次遍历完成全部替换
+    # （替换结果中不包含任何待替换字符，与逐个 replace 的结果一致）
+    _TRANSLATE_TABLE = str.maketrans(FILENAME_REPLACEMENT_CHARS)
+    
     # 文件名最大长度限制（从配置读取）
     @classmethod
     def get_max_filename_length(cls):
@@ -63,12 +80,22 @@ class FilenameNormalizer:
         Returns:
             int: 文件名最大长度
         """
-        from ..config import Config
-        # 优先使用FILENAME_NORMALIZATION中的配置
-        if 'max_filename_length' in Config.FILENAME_NORMALIZATION:
-            return Config.FILENAME_NORMALIZATION['max_filename_length']
-        # 回退到DIRECTORY_NAMING中的filename_limits配置
-        return Config.DIRECTORY_NAMING.get('filename_limits', {}).get('max_filename_length', 50)
+        global _MAX_FILENAME_LENGTH
+        if _MAX_FILENAME_LENGTH is None:
+            from ..config import Config
+            # 优先使用FILENAME_NORMALIZATION中的配置
+            if 'max_filename_length' in Config.FILENAME_NORMALIZATION:
+                _MAX_FILENAME_LENGTH = Config.FILENAME_NORMALIZATION['max_filename_length']
+            else:
+                # 回退到DIRECTORY_NAMING中的filename_limits配置
+                _MAX_FILENAME_LENGTH = Config.DIRECTORY_NAMING.get('filename_limits', {}).get('max_filename_length', 50)
+        return _MAX_FILENAME_LENGTH
+    
+    @classmethod
+    def invalidate_config_cache(cls) -> None:
+        """清除缓存的配置值，配置修改后调用"""
+        global _MAX_FILENAME_LENGTH
+        _MAX_FILENAME_LENGTH = None
     
     # 最大alt文本长度
     MAX_ALT_TEXT_LENGTH = 30
@@ -85,13 +112,37 @@ class FilenameNormalizer:
         Returns:
             str: 规范化后的文件名
         """
-        logger.debug(f"Normalizing filename: '{filename}', is_document_title: {is_document_title}")
-        if not filename:
-            return "unnamed"
+        logger.debug("Normalizing filename: %r, is_document_title: %s", filename, is_document_title)
         
         # 导入配置
         from ..config import Config
         
+        # 影响结果的配置项作为缓存键的一部分，配置变化后不会命中旧结果
+        convert_pinyin = Config.FILENAME_NORMALIZATION.get('convert_chinese_to_pinyin', True)
+        max_length = FilenameNormalizer.get_max_filename_length()
+        return FilenameNormalizer._normalize_filename_cached(
+            filename, is_document_title, convert_pinyin, max_length
+        )
+    
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _normalize_filename_cached(filename: str, is_document_title: bool,
+                                   convert_pinyin: bool, max_length: int) -> str:
+        """
+        文件名规范化的实际实现（纯函数，按参数缓存结果）
+        
+        Args:
+            filename (str): 原始文件名
+            is_document_title (bool): 是否为文档标题
+            convert_pinyin (bool): 是否进行中文转拼音
+            max_length (int): 文件名最大长度
+            
+        Returns:
+            str: 规范化后的文件名
+        """
+        if not filename:
+            return "unnamed"
+        
         # 对于文档标题，不分离扩展名，直接处理整个字符串
         if is_document_title:
             name = filename
@@ -101,25 +152,21 @@ class FilenameNormalizer:
             name, ext = os.path.splitext(filename)
 
         # 替换特殊字符，包括强制替换空格为下划线
-        for old_char, new_char in FilenameNormalizer.FILENAME_REPLACEMENT_CHARS.items():
-            name = name.replace(old_char, new_char)
-        name = name.replace(' ', '_')  # 额外确保空格替换
+        name = name.translate(FilenameNormalizer._TRANSLATE_TABLE)
         
         # 根据配置决定是否进行中文转拼音
-        if (Config.FILENAME_NORMALIZATION.get('convert_chinese_to_pinyin', True) and 
-            ext.lower() != '.md'):
+        if convert_pinyin and ext.lower() != '.md' and not name.isascii():
             # 中文转拼音（非MD文件且配置启用）
             name = FilenameNormalizer._chinese_to_pinyin(name)
         
         # 移除多余的下划线和点
-        name = re.sub(r'_+', '_', name)  # 多个下划线合并为一个
-        name = re.sub(r'\.+', '.', name)  # 多个点合并为一个
+        name = _MULTI_UNDERSCORE_RE.sub('_', name)  # 多个下划线合并为一个
+        name = _MULTI_DOT_RE.sub('.', name)  # 多个点合并为一个
         name = name.strip('_.')  # 移除首尾的下划线和点
         
         # 仅在不是文档标题时应用长度限制
         if not is_document_title:
             # 长度限制 - 考虑扩展名长度
-            max_length = FilenameNormalizer.get_max_filename_length()
             # 为扩展名预留空间
             available_length = max_length - len(ext)
             if available_length > 0 and len(name) > available_length:
@@ -134,7 +181,7 @@ class FilenameNormalizer:
             name = "unnamed"
         
         normalized_filename = name + ext
-        logger.debug(f"Final normalized filename: '{normalized_filename}'")
+        logger.debug("Final normalized filename: %r", normalized_filename)
         return normalized_filename
     
     @staticmethod
@@ -148,22 +195,24 @@ class FilenameNormalizer:
         Returns:
             str: 转换后的拼音文本
         """
-        # 检查是否包含中文字符
-        if re.search(r'[\u4e00-\u9fff]', text):
-            # 转换为拼音，使用下划线连接
-            pinyin_list = lazy_pinyin(text, style=Style.NORMAL)
-            # 只转换中文部分，保留其他字符
-            result = []
-            i = 0
-            for char in text:
-                if '\u4e00' <= char <= '\u9fff':  # 中文字符
-                    if i < len(pinyin_list):
-                        result.append(pinyin_list[i])
-                        i += 1
-                else:
-                    result.append(char)
-            return ''.join(result)
-        return text
+        # 纯ASCII文本不可能包含中文，无需扫描
+        if text.isascii():
+            return text
+        
+        global _lazy_pinyin, _pinyin_style
+        
+        # 按中文/非中文分段，只对中文段转换拼音，其他字符原样保留
+        parts = []
+        for match in _CJK_SEGMENT_RE.finditer(text):
+            segment = match.group(0)
+            if '\u4e00' <= segment[0] <= '\u9fff':  # 中文段
+                if _lazy_pinyin is None:
+                    from pypinyin import lazy_pinyin, Style
+                    _lazy_pinyin, _pinyin_style = lazy_pinyin, Style.NORMAL
+                parts.append(''.join(_lazy_pinyin(segment, style=_pinyin_style)))
+            else:
+                parts.append(segment)
+        return ''.join(parts)
     
     @staticmethod
     def normalize_alt_text(text: str) -> str:
@@ -180,7 +229,7 @@ class FilenameNormalizer:
             return "image"
         
         # 移除特殊字符，只保留字母、数字、下划线
-        normalized = re.sub(r'[^a-zA-Z0-9_\u4e00-\u9fff]', '', text)
+        normalized = _ALT_TEXT_STRIP_RE.sub('', text)
         
         # 长度限制
         if len(normalized) > FilenameNormalizer.MAX_ALT_TEXT_LENGTH: